@@ -1,20 +1,40 @@
 import datetime
-import csv
-import json
 import os
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
-import sqlite3
 from sqlite3 import Error
+from bd import a_fecha, bloqueada, obtener_conexion, ruta_bd
+from catalogo import catalogo
+from exportacion import (
+    TAMANO_LOTE,
+    EscritorCSV,
+    EscritorExcel,
+    EscritorJSON,
+    exportar_reservaciones,
+)
+from instrumentacion import activar_desde_entorno, instrumentar
+from ocupacion import obtener_indice
+import servicios
+from servicios import (
+    DIAS_ANTICIPACION,
+    ErrorServicio,
+    buscar_clientes,
+    buscar_salas_libres,
+    cupo_valido,
+    nombre_valido,
+    obtener_cliente,
+)
 import warnings
 
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 
+# EXISTS se detiene en la primera fila; COUNT(*) recorre la tabla completa
+CONSULTA_HAY_DATOS = """SELECT EXISTS (SELECT 1 FROM Clientes)
+       OR EXISTS (SELECT 1 FROM Salas)
+       OR EXISTS (SELECT 1 FROM Reservaciones)"""
+
 
 def verificar_estado_inicial():
     """Verifica si existe un estado previo de la base de datos y muestra mensaje al usuario"""
-    base_datos = "coworking.db"
+    base_datos = ruta_bd()
 
     if not os.path.exists(base_datos):
         print(
@@ -23,16 +43,12 @@ def verificar_estado_inicial():
         return False
     else:
         try:
-            with sqlite3.connect(base_datos) as conexion:
+            with obtener_conexion() as conexion:
                 cursor = conexion.cursor()
-                cursor.execute("SELECT COUNT(*) FROM Clientes")
-                clientes = cursor.fetchone()[0]
-                cursor.execute("SELECT COUNT(*) FROM Salas")
-                salas = cursor.fetchone()[0]
-                cursor.execute("SELECT COUNT(*) FROM Reservaciones")
-                reservaciones = cursor.fetchone()[0]
-
-                if clientes == 0 and salas == 0 and reservaciones == 0:
+                cursor.execute(CONSULTA_HAY_DATOS)
+                hay_datos = cursor.fetchone()[0]
+
+                if not hay_datos:
                     print(
                         "No se encontraron datos previos. Iniciando con un estado inicial vacío."
                     )
@@ -49,33 +65,15 @@ def verificar_estado_inicial():
 
 def iniciar_bd():
     """Funcion que crea la base de datos y las tablas"""
+    avisos = []
     try:
-        with sqlite3.connect("coworking.db") as conexion:
-            cursor = conexion.cursor()
-            cursor.execute(
-                """CREATE TABLE IF NOT EXISTS Clientes (id_cliente INTEGER PRIMARY KEY, nombre TEXT NOT NULL, apellido TEXT NOT NULL)"""
-            )
-            cursor.execute(
-                """CREATE TABLE IF NOT EXISTS Salas (id_sala INTEGER PRIMARY KEY, nombre TEXT NOT NULL, cupo INTEGER NOT NULL)"""
-            )
-            cursor.execute(
-                "CREATE TABLE IF NOT EXISTS Turnos (id_turno INTEGER PRIMARY KEY, turno TEXT NOT NULL)"
-            )
-            cursor.execute(
-                """CREATE TABLE IF NOT EXISTS Reservaciones (id_reservaciones INTEGER PRIMARY KEY, id_cliente INTEGER NOT NULL,
-                 id_sala INTEGER NOT NULL, fecha TEXT, id_turno INTEGER, evento TEXT NOT NULL, estatus TEXT NOT NULL DEFAULT 'Activa',
-                   FOREIGN KEY(id_cliente) REFERENCES Clientes(id_cliente), FOREIGN KEY(id_sala) REFERENCES Salas(id_sala), FOREIGN KEY(id_turno) REFERENCES Turnos(id_turno))"""
-            )
-            cursor.execute("SELECT COUNT(*) FROM Turnos")
-            if cursor.fetchone()[0] == 0:
-                cursor.executemany(
-                    "INSERT INTO Turnos (id_turno, turno) VALUES (?, ?)",
-                    [(1, "Matutino"), (2, "Vespertino"), (3, "Nocturno")],
-                )
+        servicios.crear_esquema(avisos)
     except Error as e:
         print(e)
     except Exception as e:
         print(f"Error inesperado: {e}")
+    for aviso in avisos:
+        print(aviso)
 
 
 def pedir_nombres():
@@ -84,7 +82,7 @@ def pedir_nombres():
         nombre = input("Nombre(s): ")
         if nombre == "":
             return None
-        if nombre.replace(" ", "").isalpha():
+        if nombre_valido(nombre):
             return nombre
         print("Error, ingresa el nombre correctamente. Solo letras.")
 
@@ -95,7 +93,7 @@ def pedir_apellidos():
         apellido = input("Apellido(s): ")
         if apellido == "":
             return None
-        if apellido.replace(" ", "").isalpha():
+        if nombre_valido(apellido):
             return apellido
         print("Error, Ingresa el apellido correctamente. Solo letras.")
 
@@ -106,39 +104,47 @@ def pedir_cupo():
         cupo = input("Cupo de la sala: ")
         if cupo == "":
             return None
-        if cupo.isdigit():
+        if cupo_valido(cupo):
             return cupo
         print("Error, Ingresa el número correctamente. Solo números.")
 
 
+def mostrar_clientes(clientes):
+    """Funcion que imprime la tabla de clientes"""
+    print("*" * 75)
+    print(f"**{'CLIENTES REGISTRADOS':^71}**")
+    print("*" * 75)
+    print("{:<15} {:<30} {:<30} ".format("Clave Cliente", "Nombre(s)", "Apellido(s)"))
+    print("*" * 75)
+    for cliente in clientes:
+        print("{:<15} {:<30} {:<30}".format(cliente[0], cliente[1], cliente[2]))
+    else:
+        print("*" * 75)
+
+
+@instrumentar("menu.registrar_reservacion")
 def registrar_reservacion():
     """Funcion que registrara una nueva reservacion en alguna sala disponible"""
     try:
-        with sqlite3.connect("coworking.db") as conexion:
+        with obtener_conexion() as conexion:
             cursor = conexion.cursor()
-            cursor.execute(
-                "SELECT id_cliente, nombre, apellido FROM Clientes ORDER BY apellido, nombre"
-            )
-            clientes = cursor.fetchall()
+            cursor.execute("SELECT 1 FROM Clientes LIMIT 1")
+            hay_clientes = cursor.fetchone()
+        clientes = buscar_clientes("")
     except Error as e:
         print(e)
         return
 
-    if not clientes:
+    if not hay_clientes:
         print(
             "No hay clientes registrados. Primero debe registrar un cliente para continuar."
         )
         return
 
-    print("*" * 75)
-    print(f"**{'CLIENTES REGISTRADOS':^71}**")
-    print("*" * 75)
-    print("{:<15} {:<30} {:<30} ".format("Clave Cliente", "Nombre(s)", "Apellido(s)"))
-    print("*" * 75)
-    for cliente in clientes:
-        print("{:<15} {:<30} {:<30}".format(cliente[0], cliente[1], cliente[2]))
-    else:
-        print("*" * 75)
+    mostrar_clientes(clientes)
+    print(
+        "Escribe parte del nombre o apellido para buscar otros clientes, o la clave para elegirlo."
+    )
 
     intentos_cliente = 0
     while True:
@@ -154,21 +160,35 @@ def registrar_reservacion():
                 print("No ingresaste un cliente. Intentalo de nuevo.")
                 continue
 
+        if nombre_valido(entrada):
+            try:
+                clientes = buscar_clientes(entrada)
+            except Error as e:
+                print(e)
+                return
+            if clientes:
+                mostrar_clientes(clientes)
+            else:
+                print("No se encontraron clientes con ese nombre. Intente de nuevo.")
+            continue
+
         try:
             id_cliente = int(entrada)
         except ValueError:
             print("Debe ingresar un numero valido")
             continue
-        if not any(cliente[0] == id_cliente for cliente in clientes):
+        try:
+            cliente = obtener_cliente(id_cliente)
+        except Error as e:
+            print(e)
+            return
+        if cliente is None:
             print("Cliente no encontrado. Intente de nuevo.")
             continue
         break
 
     try:
-        with sqlite3.connect("coworking.db") as conexion:
-            cursor = conexion.cursor()
-            cursor.execute("SELECT id_sala, nombre, cupo FROM Salas")
-            salas = cursor.fetchall()
+        salas = catalogo.salas()
     except Error as e:
         print(e)
         return
@@ -182,8 +202,8 @@ def registrar_reservacion():
     print("*" * 65)
     print("{:<15} {:<30} {:<20} ".format("Clave Sala", "Nombre Sala", "Cupo"))
     print("*" * 65)
-    for sala in salas:
-        print("{:<15} {:<30} {:<20}".format(sala[0], sala[1], sala[2]))
+    for id_sala, (nombre, cupo) in salas.items():
+        print("{:<15} {:<30} {:<20}".format(id_sala, nombre, cupo))
     else:
         print("*" * 65)
 
@@ -207,7 +227,7 @@ def registrar_reservacion():
             intentos_sala += 1
             print("Debe ingresar un numero valido.")
             continue
-        if not any(sala[0] == id_sala for sala in salas):
+        if id_sala not in salas:
             print("Sala no encontrada. Intente de nuevo.")
             continue
         break
@@ -232,10 +252,9 @@ def registrar_reservacion():
         try:
             Hoy = datetime.date.today()
             Fecha_evento = datetime.datetime.strptime(Fecha_str, "%m-%d-%Y").date()
-            fecha_sql = Fecha_evento.strftime("%Y-%m-%d")
             FechaAnticipada = (Fecha_evento - Hoy).days
 
-            if FechaAnticipada < 2:
+            if FechaAnticipada < DIAS_ANTICIPACION:
                 intentos_fecha += 1
                 if intentos_fecha >= 2:
                     print(
@@ -280,19 +299,18 @@ def registrar_reservacion():
                 )
                 continue
 
+    fecha_sql = Fecha_evento.strftime("%Y-%m-%d")
+
     try:
-        with sqlite3.connect("coworking.db") as conexion:
-            cursor = conexion.cursor()
-            cursor.execute("SELECT id_turno, turno FROM Turnos")
-            turnos = cursor.fetchall()
+        turnos = catalogo.turnos()
     except Error as e:
         print(e)
         return
     print("*" * 20)
     print(f"{'POSIBLES TURNOS':^20}")
     print("*" * 20)
-    for turno in turnos:
-        print(f"{turno[0]} : {turno[1]}")
+    for id_turno, turno in turnos.items():
+        print(f"{id_turno} : {turno}")
     else:
         print("*" * 20)
 
@@ -308,18 +326,11 @@ def registrar_reservacion():
         except ValueError:
             print("Debe ingresar un numero valido.")
             continue
-        if not any(turno[0] == id_turno for turno in turnos):
+        if id_turno not in turnos:
             print("Turno no encontrado. Intente nuevamente.")
             continue
         try:
-            with sqlite3.connect("coworking.db") as conexion:
-                cursor = conexion.cursor()
-                cursor.execute(
-                    "SELECT * FROM Reservaciones WHERE id_sala=? AND fecha=? AND id_turno=?",
-                    (id_sala, fecha_sql, id_turno),
-                )
-                ocupado = cursor.fetchone()
-            if ocupado:
+            if obtener_indice().ocupado(id_sala, fecha_sql, id_turno):
                 print("Esta sala ya esta reservada en esta fecha y turno. Elija otro.")
                 continue
             break
@@ -350,26 +361,85 @@ def registrar_reservacion():
         break
 
     try:
-        with sqlite3.connect("coworking.db") as conexion:
-            cursor = conexion.cursor()
-            cursor.execute(
-                """
-                INSERT INTO Reservaciones (id_cliente, id_sala, fecha, id_turno, evento, estatus)
-                VALUES (?, ?, ?, ?, ?, 'Activa')
-            """,
-                (
-                    id_cliente,
-                    id_sala,
-                    fecha_sql,
-                    id_turno,
-                    nombre_evento,
-                ),
-            )
-            print("Reservación registrada exitosamente.")
+        id_reservacion = servicios.insertar_reservacion(
+            id_cliente, id_sala, fecha_sql, id_turno, nombre_evento
+        )
     except Error as e:
-        print(e)
+        if bloqueada(e):
+            print(
+                "La base de datos esta ocupada por otro usuario. La reservacion no se registro, intentelo de nuevo."
+            )
+        else:
+            print(e)
+        return
+    if id_reservacion is None:
+        print(
+            "Otra persona reservo esta sala en la misma fecha y turno. La reservacion no se registro."
+        )
+        return
+    print("Reservación registrada exitosamente.")
+
 
+class PaginadorReservaciones(servicios.PaginadorReservaciones):
+    """Paginador de reservaciones que ademas muestra las paginas en pantalla"""
 
+    def mostrar(self):
+        """Imprime la pagina actual"""
+        print("*" * 104)
+        print(f"**{'RESERVACIONES ENCONTRADAS':^100}** ")
+        print("*" * 104)
+        print(
+            "{:<12} {:<35} {:<10} {:<12} {:<10} {:<25}".format(
+                "ID Reserva",
+                "Cliente",
+                "ID Sala",
+                "Fecha",
+                "Turno",
+                "Nombre evento",
+            )
+        )
+        print("*" * 104)
+        for reserva in self.pagina:
+            fecha_evento = a_fecha(reserva[3]).strftime("%m-%d-%Y")
+            print(
+                "{:<12} {:<35} {:<10} {:<12} {:<10} {:<25}".format(
+                    reserva[0],
+                    reserva[1],
+                    reserva[2],
+                    fecha_evento,
+                    reserva[4],
+                    reserva[5],
+                )
+            )
+        else:
+            print("*" * 104)
+        navegacion = []
+        if self.numero > 1:
+            navegacion.append("A = pagina anterior")
+        if self.hay_siguiente:
+            navegacion.append("S = pagina siguiente")
+        if navegacion:
+            print(f"Pagina {self.numero}. " + ", ".join(navegacion) + ".")
+
+    def pedir(self, mensaje):
+        """Pide una respuesta al usuario; si escribe S o A cambia de pagina y vuelve a preguntar"""
+        while True:
+            entrada = input(mensaje).strip()
+            opcion = entrada.upper()
+            if opcion not in ("S", "A"):
+                return entrada
+            try:
+                cambio = self.siguiente() if opcion == "S" else self.anterior()
+            except Error as e:
+                print(e)
+                continue
+            if cambio:
+                self.mostrar()
+            else:
+                print("No hay mas paginas en esa direccion.")
+
+
+@instrumentar("menu.editar_reservacion")
 def editar_reservacion():
     """Funcion que editara el nombre de la reservacion seleccionada por un rango de fechas"""
     intento_fecha1 = 0
@@ -419,66 +489,30 @@ def editar_reservacion():
     fecha_inicio_iso = fecha_inicio.strftime("%Y-%m-%d")
     fecha_fin_iso = fecha_fin.strftime("%Y-%m-%d")
 
+    paginador = PaginadorReservaciones(fecha_inicio_iso, fecha_fin_iso)
     try:
-        with sqlite3.connect("coworking.db") as conexion:
-            cursor = conexion.cursor()
-            cursor.execute(
-                """SELECT r.id_reservaciones, c.nombre || ' ' || c.apellido AS cliente, r.id_sala, r.fecha, t.turno, r.evento
-                    FROM Reservaciones r
-                    JOIN Clientes c ON r.id_cliente = c.id_cliente
-                    JOIN Turnos t ON r.id_turno = t.id_turno
-                    WHERE r.fecha BETWEEN ? AND ?""",
-                (fecha_inicio_iso, fecha_fin_iso),
-            )
-            reservaciones = cursor.fetchall()
+        if not paginador.siguiente():
+            print("No se encontraron reservaciones en el rango indicado.")
+            return
     except Error as e:
         print(e)
         return
-
-    if not reservaciones:
-        print("No se encontraron reservaciones en el rango indicado.")
-        return
-
-    print("*" * 104)
-    print(f"**{'RESERVACIONES ENCONTRADAS':^100}** ")
-    print("*" * 104)
-    print(
-        "{:<12} {:<35} {:<10} {:<12} {:<10} {:<25}".format(
-            "ID Reserva",
-            "Cliente",
-            "ID Sala",
-            "Fecha",
-            "Turno",
-            "Nombre evento",
-        )
-    )
-    print("*" * 104)
-    for reserva in reservaciones:
-        print(
-            "{:<12} {:<35} {:<10} {:<12} {:<10} {:<25}".format(
-                reserva[0],
-                reserva[1],
-                reserva[2],
-                reserva[3],
-                reserva[4],
-                reserva[5],
-            )
-        )
-    else:
-        print("*" * 104)
+    paginador.mostrar()
 
     intento_reservacion = 0
     while True:
-        clave = input("\nIngrese la clave de la reservación que desea editar: ").strip()
+        clave = paginador.pedir(
+            "\nIngrese la clave de la reservación que desea editar: "
+        )
         if clave == "":
             intento_reservacion += 1
             if intento_reservacion >= 2:
                 print(
                     "No ingresaste una reservacion valida. Presiona ENTER para regresar al menu."
                 )
-                clave = input(
+                clave = paginador.pedir(
                     "Ingrese la clave de la reservación que desea editar: "
-                ).strip()
+                )
                 if clave == "":
                     return
             else:
@@ -490,7 +524,12 @@ def editar_reservacion():
             print("Debe ingresar un numero valido")
             continue
 
-        if clave_editar not in [r[0] for r in reservaciones]:
+        try:
+            reservacion = paginador.buscar(clave_editar)
+        except Error as e:
+            print(e)
+            return
+        if reservacion is None:
             print("Clave inválida, intente de nuevo.")
             continue
         break
@@ -522,17 +561,15 @@ def editar_reservacion():
         return
 
     try:
-        with sqlite3.connect("coworking.db") as conexion:
-            cursor = conexion.cursor()
-            cursor.execute(
-                "UPDATE Reservaciones SET evento=? WHERE id_reservaciones=?",
-                (nuevo_nombre, clave_editar),
-            )
-            print("Nombre del evento actualizado con éxito.")
+        servicios.editar_evento(clave_editar, nuevo_nombre)
+        print("Nombre del evento actualizado con éxito.")
+    except ErrorServicio as e:
+        print(e)
     except Error as e:
         print(f"Error en la base de datos: {e}")
 
 
+@instrumentar("menu.consultar_reservacion")
 def consultar_reservacion():
     """Funcion que consultara las reservaciones existentes para una fecha especifica"""
     try:
@@ -562,68 +599,43 @@ def consultar_reservacion():
     fecha_inicio_iso = fecha_inicio.strftime("%Y-%m-%d")
     fecha_fin_iso = fecha_fin.strftime("%Y-%m-%d")
 
+    paginador = PaginadorReservaciones(fecha_inicio_iso, fecha_fin_iso, completadas=True)
     try:
-        with sqlite3.connect("coworking.db") as conexion:
-            cursor = conexion.cursor()
-            cursor.execute(
-                """SELECT r.id_reservaciones, c.nombre || ' ' || c.apellido AS cliente, r.id_sala, r.fecha, t.turno, r.evento
-                            FROM Reservaciones r
-                            JOIN Clientes c ON r.id_cliente = c.id_cliente
-                            JOIN Turnos t ON r.id_turno = t.id_turno
-                            WHERE r.estatus = 'Activa'
-                            AND r.fecha BETWEEN ? AND ?""",
-                (fecha_inicio_iso, fecha_fin_iso),
-            )
-            filas = cursor.fetchall()
+        if not paginador.siguiente():
+            print("No hay reservaciones registradas.")
+            return
     except Error as e:
         print(e)
         return
+    paginador.mostrar()
+    if paginador.hay_siguiente:
+        while paginador.pedir("S = siguiente, A = anterior, ENTER para continuar: "):
+            print("Opcion no valida.")
 
-    if not filas:
-        print("No hay reservaciones registradas.")
-        return
-
-    print("*" * 104)
-    print(f"**{'RESERVACIONES ENCONTRADAS':^100}**")
-    print("*" * 104)
-    print(
-        "{:<12} {:<35} {:<10} {:<12} {:<10} {:<25}".format(
-            "Id Reserva", "Cliente", "Id Sala", "Fecha", "Turno", "Evento"
-        )
-    )
-    print("*" * 104)
-
-    for fila in filas:
-        fecha_evento = datetime.datetime.strptime(fila[3], "%Y-%m-%d").strftime(
-            "%m-%d-%Y"
-        )
-        print(
-            "{:<12} {:<35} {:<10} {:<12} {:<10} {:<25}".format(
-                fila[0], fila[1], fila[2], fecha_evento, fila[4], fila[5]
-            )
-        )
-    else:
-        print("*" * 104)
-
+    filtro = {"fecha_inicio": fecha_inicio_iso, "fecha_fin": fecha_fin_iso}
     while True:
         try:
             print("\n¿Deseas exportar los datos?")
             print("1. Exportar a CSV")
             print("2. Exportar a Excel")
             print("3. Exportar a JSON")
-            print("4. No exportar")
+            print("4. Exportar a CSV, Excel y JSON")
+            print("5. No exportar")
             opcion = input("Selecciona una opción: ")
             if opcion.isdigit():
                 if opcion == "1":
-                    exportar_csv()
+                    exportar_csv(filtro=filtro)
                     break
                 elif opcion == "2":
-                    exportar_excel()
+                    exportar_excel(filtro=filtro)
                     break
                 elif opcion == "3":
-                    exportar_json()
+                    exportar_json(filtro=filtro)
                     break
                 elif opcion == "4":
+                    exportar_todos(filtro=filtro)
+                    break
+                elif opcion == "5":
                     print("No se exportaron los datos.")
                     break
                 else:
@@ -634,6 +646,78 @@ def consultar_reservacion():
             print("Opcion no valida. No se exportaran los datos.")
 
 
+@instrumentar("menu.buscar_salas_disponibles")
+def buscar_salas_disponibles():
+    """Funcion que muestra las salas libres con cupo suficiente para un rango de fechas y turno"""
+    try:
+        fecha_inicio_str = input("Ingrese la fecha inicial (MM-DD-AAAA): ").strip()
+        if fecha_inicio_str == "":
+            print("Busqueda cancelada.")
+            return
+        fecha_inicio = datetime.datetime.strptime(fecha_inicio_str, "%m-%d-%Y").date()
+        fecha_fin_str = input("Ingrese la fecha final (MM-DD-AAAA): ").strip()
+        if fecha_fin_str == "":
+            print("Busqueda cancelada.")
+            return
+        fecha_fin = datetime.datetime.strptime(fecha_fin_str, "%m-%d-%Y").date()
+    except ValueError:
+        print("Formato incorrecto. Use MM-DD-AAAA.")
+        return
+    if fecha_fin < fecha_inicio:
+        print("La fecha final no puede ser menor que la fecha inicial.")
+        return
+
+    try:
+        turnos = catalogo.turnos()
+    except Error as e:
+        print(e)
+        return
+    for id_turno, turno in turnos.items():
+        print(f"{id_turno} : {turno}")
+    entrada = input("Selecciona el ID del turno: ").strip()
+    if not entrada.isdigit() or int(entrada) not in turnos:
+        print("Turno no encontrado.")
+        return
+    id_turno = int(entrada)
+
+    entrada = input("Numero minimo de personas: ").strip()
+    if not cupo_valido(entrada):
+        print("Error, Ingresa el número correctamente. Solo números.")
+        return
+
+    try:
+        salas = buscar_salas_libres(fecha_inicio, fecha_fin, id_turno, int(entrada))
+    except Error as e:
+        print(e)
+        return
+    if not salas:
+        print("No hay salas disponibles con ese cupo en el rango indicado.")
+        return
+
+    print("*" * 85)
+    print(f"**{'SALAS DISPONIBLES - ' + turnos[id_turno].upper():^81}**")
+    print("*" * 85)
+    print(
+        "{:<12} {:<30} {:<8} {:<20} {:<10}".format(
+            "Clave Sala", "Nombre Sala", "Cupo", "Primera fecha libre", "Dias libres"
+        )
+    )
+    print("*" * 85)
+    for id_sala, nombre, cupo, fechas_libres in salas:
+        print(
+            "{:<12} {:<30} {:<8} {:<20} {:<10}".format(
+                id_sala,
+                nombre,
+                cupo,
+                fechas_libres[0].strftime("%m-%d-%Y"),
+                len(fechas_libres),
+            )
+        )
+    else:
+        print("*" * 85)
+
+
+@instrumentar("menu.registrar_cliente")
 def registrar_cliente():
     """Funcion que registrara a un nuevo cliente"""
 
@@ -667,19 +751,14 @@ def registrar_cliente():
     if not apellido_cliente:
         return
 
-    cliente = (nombre_cliente, apellido_cliente)
-
     try:
-        with sqlite3.connect("coworking.db") as conexion:
-            cursor = conexion.cursor()
-            cursor.execute(
-                "INSERT INTO Clientes (nombre, apellido) VALUES(?,?)", cliente
-            )
-            print("Cliente agregado exitosamente.")
-    except Error as e:
+        servicios.registrar_cliente(nombre_cliente, apellido_cliente)
+        print("Cliente agregado exitosamente.")
+    except (ErrorServicio, Error) as e:
         print(e)
 
 
+@instrumentar("menu.registrar_sala")
 def registrar_sala():
     """Funcion que registrara una nueva sala"""
     intentos_nombre = 0
@@ -716,17 +795,54 @@ def registrar_sala():
     if not cupo_sala:
         return
 
-    sala = (nombre_sala, cupo_sala)
+    try:
+        servicios.registrar_sala(nombre_sala, cupo_sala)
+        print("Sala creada exitosamente.")
+    except (ErrorServicio, Error) as e:
+        print(e)
+
 
+def mostrar_rechazos(insertados, rechazados, limite=20):
+    """Funcion que muestra el resumen de una importacion"""
+    print(f"Registros importados: {insertados}. Registros rechazados: {len(rechazados)}.")
+    for numero, motivo in rechazados[:limite]:
+        print(f"  Registro {numero}: {motivo}")
+    if len(rechazados) > limite:
+        print(f"  ... y {len(rechazados) - limite} rechazos mas.")
+
+
+@instrumentar("menu.importar_datos")
+def importar_datos():
+    """Funcion que importa clientes, salas o reservaciones desde un archivo CSV, JSON o JSON Lines"""
+    print("1. Importar clientes")
+    print("2. Importar salas")
+    print("3. Importar reservaciones")
+    opcion = input("Selecciona una opción (ENTER para volver al menu): ").strip()
+    if opcion == "":
+        return
+    importadores = {
+        "1": servicios.importar_clientes,
+        "2": servicios.importar_salas,
+        "3": servicios.importar_reservaciones,
+    }
+    if opcion not in importadores:
+        print("Error, ingresa una opcion valida")
+        return
+    ruta = input("Ruta del archivo (.csv, .json o .jsonl): ").strip()
+    if ruta == "":
+        return
     try:
-        with sqlite3.connect("coworking.db") as conexion:
-            cursor = conexion.cursor()
-            cursor.execute("INSERT INTO Salas (nombre, cupo) VALUES(?,?)", sala)
-            print("Sala creada exitosamente.")
+        insertados, rechazados = importadores[opcion](ruta)
+    except (OSError, ValueError) as e:
+        print(f"No se pudo leer el archivo: {e}")
+        return
     except Error as e:
-        print(e)
+        print(f"Error en la base de datos, no se importo ningun registro: {e}")
+        return
+    mostrar_rechazos(insertados, rechazados)
 
 
+@instrumentar("menu.cancelar_reservacion")
 def cancelar_reservacion():
     intento_fecha1 = 0
     while True:
@@ -775,71 +891,20 @@ def cancelar_reservacion():
     fecha_inicio_iso = fecha_inicio.strftime("%Y-%m-%d")
     fecha_fin_iso = fecha_fin.strftime("%Y-%m-%d")
 
+    paginador = PaginadorReservaciones(fecha_inicio_iso, fecha_fin_iso)
     try:
-        with sqlite3.connect("coworking.db") as conexion:
-            cursor = conexion.cursor()
-            cursor.execute(
-                """SELECT r.id_reservaciones, c.nombre || ' ' || c.apellido AS cliente, r.id_sala, r.fecha, t.turno, r.evento
-                   FROM Reservaciones r
-                   JOIN Clientes c ON r.id_cliente = c.id_cliente
-                   JOIN Salas s ON r.id_sala = s.id_sala
-                   JOIN Turnos t ON r.id_turno = t.id_turno
-                   WHERE r.estatus = 'Activa'
-                   ORDER BY r.fecha ASC"""
-            )
-            filas = cursor.fetchall()
+        if not paginador.siguiente():
+            print("No hay reservaciones en el rango indicado.")
+            return
     except Error as e:
         print(e)
         return
-
-    reservaciones = [
-        fila
-        for fila in filas
-        if fecha_inicio_iso
-        <= datetime.datetime.strptime(fila[3], "%Y-%m-%d").strftime("%Y-%m-%d")
-        <= fecha_fin_iso
-    ]
-
-    if not reservaciones:
-        print("No hay reservaciones en el rango indicado.")
-        return
-
-    print("*" * 104)
-    print(f"**{'RESERVACIONES ENCONTRADAS':^100}** ")
-    print("*" * 104)
-    print(
-        "{:<12} {:<35} {:<10} {:<12} {:<10} {:<25}".format(
-            "ID Reserva",
-            "Cliente",
-            "ID Sala",
-            "Fecha",
-            "Turno",
-            "Nombre evento",
-        )
-    )
-    print("*" * 104)
-
-    for reserva in reservaciones:
-        fecha_evento = datetime.datetime.strptime(reserva[3], "%Y-%m-%d").strftime(
-            "%m-%d-%Y"
-        )
-        print(
-            "{:<12} {:<35} {:<10} {:<12} {:<10} {:<25}".format(
-                reserva[0],
-                reserva[1],
-                reserva[2],
-                fecha_evento,
-                reserva[4],
-                reserva[5],
-            )
-        )
-    else:
-        print("*" * 104)
+    paginador.mostrar()
 
     while True:
-        entrada = input(
+        entrada = paginador.pedir(
             "Ingrese el ID de la reservación a cancelar (ENTER para salir): "
-        ).strip()
+        )
         if entrada == "":
             print("Operación cancelada.")
             return
@@ -848,15 +913,18 @@ def cancelar_reservacion():
         except ValueError:
             print("Debe ingresar un número válido.")
             continue
-        if id_reservacion not in [r[0] for r in reservaciones]:
+        try:
+            reservacion = paginador.buscar(id_reservacion)
+        except Error as e:
+            print(e)
+            return
+        if reservacion is None:
             print("Folio no válido. Intente nuevamente.")
             continue
         break
     hoy = datetime.date.today()
-    fecha_evento = datetime.datetime.strptime(
-        [r[3] for r in reservaciones if r[0] == id_reservacion][0], "%Y-%m-%d"
-    ).date()
-    if (fecha_evento - hoy).days < 2:
+    fecha_evento = a_fecha(reservacion[3])
+    if (fecha_evento - hoy).days < DIAS_ANTICIPACION:
         print("La reservación no puede cancelarse con menos de 2 días de anticipación.")
         return
     confirmacion = (
@@ -870,203 +938,86 @@ def cancelar_reservacion():
         print("Operación cancelada por el usuario.")
         return
     try:
-        with sqlite3.connect("coworking.db") as conexion:
-            cursor = conexion.cursor()
-            cursor.execute(
-                "UPDATE Reservaciones SET estatus = 'Cancelada', fecha = NULL, id_turno = NULL WHERE id_reservaciones = ?",
-                (id_reservacion,),
-            )
+        servicios.cancelar(id_reservacion, hoy)
         print(f"Reservación {id_reservacion} cancelada exitosamente.")
     except Error as e:
+        if bloqueada(e):
+            print(
+                "La base de datos esta ocupada por otro usuario. La reservacion no se cancelo, intentelo de nuevo."
+            )
+        else:
+            print(e)
+    except ErrorServicio as e:
         print(e)
 
 
-def exportar_csv():
-    """Exporta las reservaciones a un archivo CSV"""
+def _exportar(escritores, mensaje, **opciones):
+    """Funcion que ejecuta la exportacion y muestra el resultado al usuario"""
     try:
-        with sqlite3.connect("coworking.db") as conexion:
-            cursor = conexion.cursor()
-            cursor.execute("""SELECT r.id_reservaciones,
-              c.nombre || ' ' || c.apellido AS nombre_cliente,
-              s.nombre AS nombre_sala,
-              r.fecha,
-              t.turno,
-              r.evento
-       FROM Reservaciones r
-       JOIN Clientes c ON r.id_cliente = c.id_cliente
-       JOIN Salas s ON r.id_sala = s.id_sala
-       JOIN Turnos t ON r.id_turno = t.id_turno
-       WHERE r.estatus = 'Activa' 
-       ORDER BY r.fecha ASC""")
-            reservaciones = cursor.fetchall()
+        total = exportar_reservaciones(escritores, **opciones)
     except Error as e:
         print(e)
-
-    if not reservaciones:
-        print("No hay reservaciones para exportar.")
         return
-
-    try:
-        with open(
-            "Reservaciones.csv", mode="w", encoding="utf-8", newline=""
-        ) as archivo:
-            writer = csv.writer(archivo)
-
-            encabezados = [
-                "Clave".ljust(7),
-                "Cliente".ljust(30),
-                "Sala".ljust(20),
-                "Fecha".ljust(12),
-                "Turno".ljust(10),
-                "Evento".ljust(25),
-            ]
-            writer.writerow(encabezados)
-            writer.writerow(["-" * 7, "-" * 30, "-" * 20, "-" * 12, "-" * 10, "-" * 25])
-
-            for fila in reservaciones:
-                id_reservacion, nombre_cliente, nombre_sala, fecha, turno, evento = fila
-                fecha_formateada = datetime.datetime.strptime(
-                    fecha, "%Y-%m-%d"
-                ).strftime("%m-%d-%Y")
-                writer.writerow(
-                    [
-                        str(id_reservacion).ljust(7),
-                        nombre_cliente.ljust(30),
-                        nombre_sala.ljust(20),
-                        fecha_formateada.ljust(12),
-                        turno.ljust(10),
-                        evento.ljust(25),
-                    ]
-                )
-
-        print("Archivo 'reservaciones.csv' creado exitosamente.")
     except Exception as e:
-        print(f"Error al crear el archivo {e}")
-
-
-def exportar_excel():
-    """Funcion que exporta las reservaciones a un archivo Excel"""
-    try:
-        with sqlite3.connect("coworking.db") as conexion:
-            cursor = conexion.cursor()
-            cursor.execute("""SELECT r.id_reservaciones,
-              c.nombre || ' ' || c.apellido AS nombre_cliente,
-              s.nombre AS nombre_sala,
-              r.fecha,
-              t.turno,
-              r.evento
-       FROM Reservaciones r
-       JOIN Clientes c ON r.id_cliente = c.id_cliente
-       JOIN Salas s ON r.id_sala = s.id_sala
-       JOIN Turnos t ON r.id_turno = t.id_turno
-       WHERE r.estatus = 'Activa' 
-       ORDER BY r.fecha ASC""")
-            reservaciones = cursor.fetchall()
-    except Error as e:
-        print(e)
+        print(f"Error al exportar: {e}")
         return
-
-    if not reservaciones:
+    errores = [escritor for escritor in escritores if escritor.error]
+    for escritor in errores:
+        print(f"Error al exportar {escritor.ruta}: {escritor.error}")
+    if errores:
+        return
+    if total == 0:
         print("No hay reservaciones para exportar.")
         return
+    print(mensaje)
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Reservaciones"
-
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=6)
-    cell = ws.cell(row=1, column=1)
-    cell.value = "REPORTE DE RESERVACIONES"
-    cell.font = Font(bold=True, size=14)
-    cell.alignment = Alignment(horizontal="center")
-
-    encabezados = ["Clave Reservacion", "Cliente", "Sala", "Fecha", "Turno", "Evento"]
-    negrita = Font(bold=True)
-    borde_grueso = Border(bottom=Side(style="thick"))
-    alineado = Alignment(horizontal="center")
-
-    for col, encabezado in enumerate(encabezados, start=1):
-        celda = ws.cell(row=3, column=col, value=encabezado)
-        celda.font = negrita
-        celda.alignment = alineado
-        celda.border = borde_grueso
-
-    for fila, dato in enumerate(reservaciones, start=4):
-        id_reservacion, nombre_cliente, nombre_sala, fecha, turno, evento = dato
-        fecha_formateada = datetime.datetime.strptime(fecha, "%Y-%m-%d").strftime(
-            "%m-%d-%Y"
-        )
-        valores = [
-            id_reservacion,
-            nombre_cliente,
-            nombre_sala,
-            fecha_formateada,
-            turno,
-            evento,
-        ]
-        for col, valor in enumerate(valores, start=1):
-            celda = ws.cell(row=fila, column=col, value=valor)
-            celda.alignment = Alignment(horizontal="center")
-
-    for col in range(1, 7):
-        max_len = max(
-            len(str(c.value)) if c.value else 0 for c in ws[get_column_letter(col)]
-        )
-        ws.column_dimensions[get_column_letter(col)].width = max_len + 3
 
-    ruta = os.path.join(os.getcwd(), "DatosReservaciones.xlsx")
-    wb.save(ruta)
-    print("Archivo Excel exportado correctamente")
+def exportar_csv(ruta="Reservaciones.csv", tamano_lote=TAMANO_LOTE, filtro=None):
+    """Exporta las reservaciones a un archivo CSV leyendo el cursor por lotes,
+    de modo que la memoria usada no depende del numero de reservaciones"""
+    _exportar(
+        [EscritorCSV(ruta)],
+        f"Archivo '{ruta}' creado exitosamente.",
+        tamano_lote=tamano_lote,
+        filtro=filtro,
+    )
+
 
+def exportar_excel(ruta="DatosReservaciones.xlsx", tamano_lote=TAMANO_LOTE, filtro=None):
+    """Funcion que exporta las reservaciones a un archivo Excel en modo de solo escritura"""
+    _exportar(
+        [EscritorExcel(ruta)],
+        "Archivo Excel exportado correctamente",
+        tamano_lote=tamano_lote,
+        filtro=filtro,
+    )
 
-def exportar_json():
-    """Exporta las reservaciones de la base de datos a un archivo JSON."""
-    try:
-        with sqlite3.connect("coworking.db") as conexion:
-            cursor = conexion.cursor()
-            cursor.execute("""SELECT r.id_reservaciones,
-              c.nombre || ' ' || c.apellido AS nombre_cliente,
-              s.nombre AS nombre_sala,
-              r.fecha,
-              t.turno,
-              r.evento
-       FROM Reservaciones r
-       JOIN Clientes c ON r.id_cliente = c.id_cliente
-       JOIN Salas s ON r.id_sala = s.id_sala
-       JOIN Turnos t ON r.id_turno = t.id_turno
-       WHERE r.estatus = 'Activa' 
-       ORDER BY r.fecha ASC""")
-            reservaciones = cursor.fetchall()
-    except Error as e:
-        print(e)
-        return
 
-    if not reservaciones:
-        print("No hay reservaciones para exportar a JSON.")
+def exportar_json(
+    ruta=None, formato="json", compacto=False, tamano_lote=TAMANO_LOTE, filtro=None
+):
+    """Exporta las reservaciones de la base de datos a un archivo JSON escribiendo
+    elemento por elemento desde el cursor"""
+    if formato not in ("json", "jsonl"):
+        print(f"Formato de exportacion no valido: {formato}")
         return
+    _exportar(
+        [EscritorJSON(ruta, formato, compacto)],
+        "Archivo JSON exportado correctamente",
+        tamano_lote=tamano_lote,
+        filtro=filtro,
+    )
 
-    lista = []
-    for idr, cliente, sala, fecha, turno, evento in reservaciones:
-        fecha_formateada = datetime.datetime.strptime(fecha, "%Y-%m-%d").strftime(
-            "%m-%d-%Y"
-        )
-        lista.append(
-            {
-                "Clave": idr,
-                "Cliente": cliente,
-                "Sala": sala,
-                "Fecha": fecha_formateada,
-                "Turno": turno,
-                "Evento": evento,
-            }
-        )
-    try:
-        ruta = os.path.join(os.getcwd(), "ReservacionesJSON.json")
-        with open(ruta, "w", encoding="utf-8") as file:
-            json.dump(lista, file, indent=4, ensure_ascii=False)
-        print("Archivo JSON exportado correctamente")
-    except Exception as e:
-        print(f"Error al exportar a JSON: {e}")
+
+def exportar_todos(en_hilos=True, tamano_lote=TAMANO_LOTE, filtro=None):
+    """Funcion que exporta las reservaciones a CSV, Excel y JSON con una sola consulta"""
+    _exportar(
+        [EscritorCSV(), EscritorExcel(), EscritorJSON()],
+        "Archivos CSV, Excel y JSON exportados correctamente",
+        en_hilos=en_hilos,
+        tamano_lote=tamano_lote,
+        filtro=filtro,
+    )
 
 
 def main():
@@ -1079,8 +1030,10 @@ def main():
         print("4. Cancelar reservacion.")
         print("5. Registrar nuevo cliente.")
         print("6. Registrar nueva sala.")
-        print("7. Salir.\n")
-        opcion = input("Selecciona la opcion que necesites (1-7): ")
+        print("7. Importar clientes, salas o reservaciones desde archivo.")
+        print("8. Buscar salas disponibles.")
+        print("9. Salir.\n")
+        opcion = input("Selecciona la opcion que necesites (1-9): ")
         if opcion.isdigit():
             if opcion == "1":
                 registrar_reservacion()
@@ -1095,6 +1048,10 @@ def main():
             elif opcion == "6":
                 registrar_sala()
             elif opcion == "7":
+                importar_datos()
+            elif opcion == "8":
+                buscar_salas_disponibles()
+            elif opcion == "9":
                 salir = input(
                     "¿Desea salir realmente? Si (s) / No (Presione cualquier otra tecla): "
                 ).lower()
@@ -1108,6 +1065,7 @@ def main():
 
 
 if __name__ == "__main__":
+    activar_desde_entorno()
     iniciar_bd()
     existente = verificar_estado_inicial()
     main()
@@ -0,0 +1,79 @@
+"""Archivo de reservaciones canceladas y pasadas.
+
+archivar() mueve de Reservaciones a ReservacionesArchivo las reservaciones
+canceladas y las activas cuya fecha ya paso (que se archivan como 'Completada'),
+conservando la fecha, el turno y el momento de la cancelacion. Se ejecuta por
+lotes, cada uno en su propia transaccion, para que la tabla de trabajo y sus
+indices se mantengan chicos sin retener el candado de escritura. El historial
+completo se consulta en la vista HistorialReservaciones.
+
+    python cli.py archive
+"""
+
+import datetime
+import time
+
+from bd import a_dia
+from instrumentacion import instrumentar
+from ocupacion import transaccion_ocupacion
+
+TAMANO_LOTE_ARCHIVO = 1000
+
+PAUSA_ENTRE_LOTES = 0.01
+
+# La reservacion con la clave mas alta nunca se archiva: sin AUTOINCREMENT SQLite
+# asigna max(id_reservaciones) + 1 y una clave borrada podria volver a usarse
+CONSULTA_POR_ARCHIVAR = """SELECT id_reservaciones, estatus, id_sala, fecha, id_turno
+       FROM (SELECT id_reservaciones, estatus, id_sala, fecha, id_turno FROM Reservaciones
+             WHERE estatus <> 'Activa'
+             UNION ALL
+             SELECT id_reservaciones, estatus, id_sala, fecha, id_turno FROM Reservaciones
+             WHERE estatus = 'Activa' AND fecha < ?)
+       WHERE id_reservaciones < (SELECT max(id_reservaciones) FROM Reservaciones)
+       LIMIT ?"""
+
+INSERTAR_ARCHIVO = """INSERT INTO ReservacionesArchivo (id_reservaciones, id_cliente, id_sala,
+              fecha, id_turno, evento, estatus, cancelada_en, archivada_en)
+       SELECT id_reservaciones, id_cliente, id_sala, fecha, id_turno, evento,
+              CASE WHEN estatus = 'Activa' THEN 'Completada' ELSE estatus END,
+              cancelada_en, ?
+       FROM Reservaciones WHERE id_reservaciones = ?"""
+
+
+@instrumentar()
+def archivar(hoy=None, tamano_lote=TAMANO_LOTE_ARCHIVO, maximo_lotes=None):
+    """Funcion que archiva las reservaciones canceladas y las anteriores a hoy.
+    hoy puede adelantarse para pruebas pero nunca pasa de la fecha actual: una
+    reservacion activa futura que sale de Reservaciones deja de ocupar su espacio
+    en el indice unico. maximo_lotes limita el trabajo de una corrida; lo que falte
+    se archiva en la siguiente. Regresa el numero de reservaciones archivadas"""
+    dia_hoy = datetime.date.today().toordinal()
+    if hoy is not None:
+        dia_hoy = min(a_dia(hoy), dia_hoy)
+    total = 0
+    lotes = 0
+    while maximo_lotes is None or lotes < maximo_lotes:
+        if lotes:
+            time.sleep(PAUSA_ENTRE_LOTES)
+        archivada_en = datetime.datetime.now().isoformat(timespec="seconds")
+        with transaccion_ocupacion() as (conexion, cambios):
+            cursor = conexion.cursor()
+            cursor.execute(CONSULTA_POR_ARCHIVAR, (dia_hoy, tamano_lote))
+            lote = cursor.fetchall()
+            claves = [(archivada_en, fila[0]) for fila in lote]
+            cursor.executemany(INSERTAR_ARCHIVO, claves)
+            cursor.executemany(
+                "DELETE FROM Reservaciones WHERE id_reservaciones = ?",
+                [(fila[0],) for fila in lote],
+            )
+            cambios.extend(
+                (id_sala, fecha, id_turno, 0)
+                for _, estatus, id_sala, fecha, id_turno in lote
+                if estatus == "Activa"
+            )
+        total += len(lote)
+        lotes += 1
+        if len(lote) < tamano_lote:
+            break
+    return total
+
@@ -0,0 +1,176 @@
+import atexit
+import datetime
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+_ruta = os.environ.get("COWORKING_DB", "coworking.db")
+
+# busy_timeout va primero para que los demas pragmas tambien esperen el candado
+PRAGMAS = {
+    "busy_timeout": int(os.environ.get("COWORKING_BUSY_TIMEOUT", 5000)),
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -20000,
+    "mmap_size": 268435456,
+    "foreign_keys": "ON",
+}
+
+# Reintentos de BEGIN IMMEDIATE cuando busy_timeout se agota por otro escritor
+REINTENTOS_ESCRITURA = 5
+ESPERA_REINTENTO = 0.05
+
+# Las fechas se guardan como numero de dia (datetime.date.toordinal()).
+# julianday('0001-01-01') es 1721425.5 y date(1, 1, 1).toordinal() es 1, asi que
+# en SQL la fecha es date(fecha + DIFERENCIA_JULIANA)
+DIFERENCIA_JULIANA = 1721424.5
+
+_local = threading.local()
+_candado = threading.Lock()
+_abiertas = []
+_al_abrir = []
+_generacion = 0
+
+
+def a_dia(fecha):
+    """Funcion que convierte una fecha (date, texto AAAA-MM-DD o numero de dia) al
+    numero de dia con el que se guarda en la base de datos"""
+    if isinstance(fecha, int):
+        return fecha
+    if isinstance(fecha, str):
+        fecha = datetime.date.fromisoformat(fecha)
+    return fecha.toordinal()
+
+
+def a_fecha(dia):
+    """Funcion que convierte un numero de dia de la base de datos a datetime.date"""
+    return datetime.date.fromordinal(dia)
+
+
+def ruta_bd():
+    """Funcion que regresa la ruta de la base de datos configurada"""
+    return _ruta
+
+
+def configurar_bd(ruta=None, reintentos=None, espera=None, **pragmas):
+    """Funcion que cambia la ruta, los reintentos de escritura y/o los pragmas de la
+    base de datos. Las conexiones abiertas se cierran para que las nuevas usen la
+    configuracion"""
+    global _ruta, REINTENTOS_ESCRITURA, ESPERA_REINTENTO
+    cerrar_conexiones()
+    if ruta is not None:
+        _ruta = ruta
+    if reintentos is not None:
+        REINTENTOS_ESCRITURA = reintentos
+    if espera is not None:
+        ESPERA_REINTENTO = espera
+    PRAGMAS.update(pragmas)
+
+
+def abrir_conexion():
+    """Funcion que abre una conexion nueva con los pragmas aplicados"""
+    conexion = sqlite3.connect(_ruta, check_same_thread=False)
+    cursor = conexion.cursor()
+    for nombre, valor in PRAGMAS.items():
+        cursor.execute(f"PRAGMA {nombre} = {valor}")
+    cursor.close()
+    with _candado:
+        _abiertas.append(conexion)
+        funciones = _al_abrir[:]
+    for funcion in funciones:
+        funcion(conexion)
+    return conexion
+
+
+def al_abrir(funcion):
+    """Funcion que registra funcion(conexion) para aplicarla a cada conexion nueva
+    y la aplica de inmediato a las conexiones ya abiertas"""
+    with _candado:
+        _al_abrir.append(funcion)
+        abiertas = _abiertas[:]
+    for conexion in abiertas:
+        funcion(conexion)
+
+
+def quitar_al_abrir(funcion, deshacer=None):
+    """Funcion que deja de aplicar funcion a las conexiones nuevas y, si se indica,
+    aplica deshacer(conexion) a las conexiones abiertas"""
+    with _candado:
+        if funcion in _al_abrir:
+            _al_abrir.remove(funcion)
+        abiertas = _abiertas[:]
+    if deshacer is not None:
+        for conexion in abiertas:
+            deshacer(conexion)
+
+
+def obtener_conexion():
+    """Funcion que regresa la conexion reutilizable del hilo actual.
+    Se usa igual que sqlite3.connect: 'with obtener_conexion() as conexion'
+    confirma o revierte la transaccion, pero no cierra la conexion"""
+    conexion = getattr(_local, "conexion", None)
+    if conexion is None or getattr(_local, "generacion", None) != _generacion:
+        conexion = abrir_conexion()
+        _local.conexion = conexion
+        _local.generacion = _generacion
+    return conexion
+
+
+def bloqueada(error):
+    """Funcion que indica si el error se debe a que otra conexion tiene el candado"""
+    mensaje = str(error)
+    return isinstance(error, sqlite3.OperationalError) and (
+        "locked" in mensaje or "busy" in mensaje
+    )
+
+
+@contextmanager
+def transaccion_escritura(conexion=None):
+    """Abre una transaccion de escritura con BEGIN IMMEDIATE, la confirma al salir
+    o la revierte si hay una excepcion.
+    El candado de escritura se toma al inicio, asi que las lecturas dentro de la
+    transaccion ven los datos que se van a modificar y ninguna sentencia posterior
+    puede fallar con 'database is locked'. Si otro escritor retiene el candado mas
+    de busy_timeout, BEGIN se reintenta hasta REINTENTOS_ESCRITURA veces con espera
+    exponencial antes de propagar el error. Si la conexion ya tiene una transaccion
+    abierta se lanza sqlite3.ProgrammingError en vez de confirmarla a medias"""
+    conexion = conexion or obtener_conexion()
+    if conexion.in_transaction:
+        raise sqlite3.ProgrammingError(
+            "La conexion ya tiene una transaccion abierta; confirmela o reviertala "
+            "antes de abrir una transaccion de escritura."
+        )
+    for intento in range(REINTENTOS_ESCRITURA + 1):
+        try:
+            conexion.execute("BEGIN IMMEDIATE")
+            break
+        except sqlite3.OperationalError as e:
+            if not bloqueada(e) or intento == REINTENTOS_ESCRITURA:
+                raise
+            time.sleep(ESPERA_REINTENTO * 2**intento * (0.5 + random.random()))
+    try:
+        yield conexion
+    except BaseException:
+        conexion.rollback()
+        raise
+    conexion.commit()
+
+
+def cerrar_conexiones():
+    """Funcion que cierra todas las conexiones abiertas por este modulo"""
+    global _generacion
+    with _candado:
+        _generacion += 1
+        abiertas = _abiertas[:]
+        _abiertas.clear()
+    for conexion in abiertas:
+        try:
+            conexion.close()
+        except sqlite3.Error:
+            pass
+
+
+atexit.register(cerrar_conexiones)
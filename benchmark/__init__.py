@@ -0,0 +1,11 @@
+"""Generador de datos sinteticos y mediciones de rendimiento del coworking.
+
+    python -m benchmark --clientes 5000 --salas 30 --anios 3 --salida reporte.json
+    python -m benchmark --bd grande.db --reusar --comparar reporte_anterior.json
+"""
+
+from benchmark.generador import generar_bd
+from benchmark.mediciones import medir, medir_operaciones
+from benchmark.reporte import comparar, crear_reporte
+
+__all__ = ["comparar", "crear_reporte", "generar_bd", "medir", "medir_operaciones"]
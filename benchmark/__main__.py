@@ -0,0 +1,111 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import bd
+from benchmark import comparar, crear_reporte, generar_bd, medir_operaciones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmark",
+        description="Genera una base de datos sintetica y mide las operaciones frecuentes",
+    )
+    parser.add_argument("--bd", help="Ruta de la base de datos (por omision una temporal)")
+    parser.add_argument(
+        "--reusar", action="store_true", help="Mide la base de datos --bd sin generarla"
+    )
+    parser.add_argument("--clientes", type=int, default=1000)
+    parser.add_argument("--salas", type=int, default=20)
+    parser.add_argument("--anios", type=float, default=2)
+    parser.add_argument("--canceladas", type=float, default=0.1, help="Proporcion")
+    parser.add_argument("--ocupacion", type=float, default=0.5, help="Proporcion")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--repeticiones-exportar", type=int, default=3)
+    parser.add_argument(
+        "--repeticiones-inicio",
+        type=int,
+        default=5,
+        help="Veces que se inicia el programa en un proceso nuevo",
+    )
+    parser.add_argument("--salida", help="Archivo JSON del reporte (por omision stdout)")
+    parser.add_argument("--comparar", help="Reporte JSON anterior para comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.2)
+    argumentos = parser.parse_args(argv)
+
+    temporal = None
+    ruta = argumentos.bd
+    if ruta is None:
+        temporal = tempfile.TemporaryDirectory()
+        ruta = os.path.join(temporal.name, "benchmark.db")
+    try:
+        parametros = {
+            "clientes": argumentos.clientes,
+            "salas": argumentos.salas,
+            "anios": argumentos.anios,
+            "proporcion_canceladas": argumentos.canceladas,
+            "ocupacion": argumentos.ocupacion,
+            "semilla": argumentos.semilla,
+            "repeticiones": argumentos.repeticiones,
+            "repeticiones_exportar": argumentos.repeticiones_exportar,
+            "repeticiones_inicio": argumentos.repeticiones_inicio,
+        }
+        if argumentos.reusar:
+            if not os.path.exists(ruta):
+                parser.error(f"No existe la base de datos {ruta}")
+            bd.configurar_bd(ruta)
+            datos = {"reusada": ruta}
+        else:
+            if os.path.exists(ruta):
+                parser.error(f"{ruta} ya existe; use --reusar o indique otra ruta")
+            inicio = time.perf_counter()
+            datos = generar_bd(
+                ruta,
+                argumentos.clientes,
+                argumentos.salas,
+                argumentos.anios,
+                argumentos.canceladas,
+                argumentos.ocupacion,
+                argumentos.semilla,
+            )
+            datos["generacion_s"] = round(time.perf_counter() - inicio, 3)
+        datos["tamano_bytes"] = os.path.getsize(ruta)
+
+        operaciones = medir_operaciones(
+            argumentos.repeticiones,
+            argumentos.repeticiones_exportar,
+            argumentos.semilla,
+            repeticiones_inicio=argumentos.repeticiones_inicio,
+        )
+        reporte = crear_reporte(datos, operaciones, parametros)
+        if argumentos.comparar:
+            with open(argumentos.comparar, encoding="utf-8") as archivo:
+                reporte["comparacion"] = comparar(
+                    reporte, json.load(archivo), argumentos.tolerancia
+                )
+        bd.cerrar_conexiones()
+    finally:
+        if temporal is not None:
+            bd.cerrar_conexiones()
+            temporal.cleanup()
+
+    texto = json.dumps(reporte, indent=2, ensure_ascii=False)
+    if argumentos.salida:
+        with open(argumentos.salida, "w", encoding="utf-8") as archivo:
+            archivo.write(texto + "\n")
+    else:
+        print(texto)
+    regresiones = [
+        nombre
+        for nombre, cambio in reporte.get("comparacion", {}).items()
+        if cambio["regresion"]
+    ]
+    return 1 if regresiones else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+import datetime
+import random
+
+import bd
+import servicios
+
+NOMBRES = (
+    "Ana Luis Maria Jose Sofia Carlos Lucia Jorge Elena Miguel Valeria Diego "
+    "Camila Fernando Daniela Ricardo Paula Andres Gabriela Hector"
+).split()
+
+APELLIDOS = (
+    "Garcia Martinez Lopez Hernandez Gonzalez Perez Rodriguez Sanchez Ramirez "
+    "Cruz Flores Gomez Morales Vazquez Reyes Jimenez Torres Diaz Gutierrez Ruiz "
+    "Mendoza Aguilar Ortiz Castillo Romero"
+).split()
+
+EVENTOS = (
+    "Junta Capacitacion Taller Entrevista Conferencia Reunion Presentacion "
+    "Seminario Curso Asamblea"
+).split()
+
+TAMANO_LOTE = 5000
+
+
+def generar_bd(
+    ruta,
+    clientes=1000,
+    salas=20,
+    anios=2,
+    proporcion_canceladas=0.1,
+    ocupacion=0.5,
+    semilla=0,
+    hoy=None,
+):
+    """Funcion que crea una base de datos sintetica en 'ruta' (que no debe existir).
+    Las reservaciones cubren 'anios' anios centrados en hoy, sin domingos; cada
+    espacio (sala, dia, turno) se ocupa con probabilidad 'ocupacion' y una
+    'proporcion_canceladas' de ellas queda cancelada como lo hace el menu.
+    Regresa un diccionario con lo que se genero"""
+    aleatorio = random.Random(semilla)
+    if hoy is None:
+        hoy = datetime.date.today()
+    dias = int(anios * 365)
+    inicio = hoy - datetime.timedelta(days=dias // 2)
+
+    bd.configurar_bd(ruta)
+    servicios.crear_esquema()
+    with bd.transaccion_escritura() as conexion:
+        cursor = conexion.cursor()
+        cursor.executemany(
+            "INSERT INTO Clientes (nombre, apellido) VALUES (?, ?)",
+            (
+                (
+                    aleatorio.choice(NOMBRES),
+                    aleatorio.choice(APELLIDOS) + " " + aleatorio.choice(APELLIDOS),
+                )
+                for _ in range(clientes)
+            ),
+        )
+        cursor.executemany(
+            "INSERT INTO Salas (nombre, cupo) VALUES (?, ?)",
+            (
+                (f"Sala {numero}", aleatorio.choice((4, 6, 8, 10, 12, 20, 30, 50)))
+                for numero in range(1, salas + 1)
+            ),
+        )
+        cursor.execute("SELECT id_turno FROM Turnos")
+        turnos = [fila[0] for fila in cursor.fetchall()]
+
+    activas = 0
+    canceladas = 0
+    lote = []
+    for desplazamiento in range(dias):
+        fecha = inicio + datetime.timedelta(days=desplazamiento)
+        if fecha.weekday() == 6:
+            continue
+        dia = fecha.toordinal()
+        for id_sala in range(1, salas + 1):
+            for id_turno in turnos:
+                if aleatorio.random() >= ocupacion:
+                    continue
+                id_cliente = aleatorio.randint(1, clientes)
+                evento = aleatorio.choice(EVENTOS)
+                if aleatorio.random() < proporcion_canceladas:
+                    lote.append((id_cliente, id_sala, dia, id_turno, evento, "Cancelada"))
+                    canceladas += 1
+                else:
+                    lote.append(
+                        (id_cliente, id_sala, dia, id_turno, evento, "Activa")
+                    )
+                    activas += 1
+                if len(lote) >= TAMANO_LOTE:
+                    _insertar_reservaciones(lote)
+                    lote = []
+    if lote:
+        _insertar_reservaciones(lote)
+    with bd.obtener_conexion() as conexion:
+        conexion.execute("ANALYZE")
+    # Las conexiones nuevas recargan el indice de ocupacion y los catalogos
+    bd.cerrar_conexiones()
+    return {
+        "clientes": clientes,
+        "salas": salas,
+        "anios": anios,
+        "desde": inicio.isoformat(),
+        "hasta": (inicio + datetime.timedelta(days=dias - 1)).isoformat(),
+        "reservaciones_activas": activas,
+        "reservaciones_canceladas": canceladas,
+    }
+
+
+def _insertar_reservaciones(lote):
+    with bd.transaccion_escritura() as conexion:
+        conexion.executemany(
+            """INSERT INTO Reservaciones (id_cliente, id_sala, fecha, id_turno, evento, estatus)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            lote,
+        )
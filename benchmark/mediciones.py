@@ -0,0 +1,151 @@
+import contextlib
+import datetime
+import io
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import bd
+import PIA_prueba
+import servicios
+from catalogo import catalogo
+from exportacion import EscritorCSV, EscritorExcel, EscritorJSON, exportar_reservaciones
+from ocupacion import obtener_indice
+
+
+def medir(funcion, repeticiones, operaciones_por_repeticion=1):
+    """Funcion que ejecuta 'funcion' varias veces y regresa las estadisticas en
+    milisegundos por operacion. Si una repeticion agrupa varias operaciones
+    (operaciones_por_repeticion) el tiempo se divide entre ellas"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(
+            (time.perf_counter() - inicio) * 1000 / operaciones_por_repeticion
+        )
+    tiempos.sort()
+    return {
+        "repeticiones": repeticiones,
+        "operaciones_por_repeticion": operaciones_por_repeticion,
+        "min_ms": round(tiempos[0], 4),
+        "mediana_ms": round(statistics.median(tiempos), 4),
+        "p95_ms": round(tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))], 4),
+        "max_ms": round(tiempos[-1], 4),
+    }
+
+
+def _silencio():
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def arranque():
+    """Arranque en frio del programa: conexion nueva, iniciar_bd y verificar_estado_inicial"""
+    bd.cerrar_conexiones()
+    with _silencio():
+        PIA_prueba.iniciar_bd()
+        PIA_prueba.verificar_estado_inicial()
+
+
+DIRECTORIO_PROGRAMA = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROGRAMA_INICIO = """import sys
+import PIA_prueba
+PIA_prueba.iniciar_bd()
+PIA_prueba.verificar_estado_inicial()
+sys.exit("openpyxl" in sys.modules)
+"""
+
+
+def inicio_programa():
+    """Inicio del programa en un proceso nuevo: interprete, imports, iniciar_bd y
+    verificar_estado_inicial. Falla si el arranque importa openpyxl"""
+    resultado = subprocess.run(
+        [sys.executable, "-c", PROGRAMA_INICIO],
+        cwd=DIRECTORIO_PROGRAMA,
+        env={**os.environ, "COWORKING_DB": os.path.abspath(bd.ruta_bd())},
+        stdout=subprocess.DEVNULL,
+    )
+    if resultado.returncode:
+        raise RuntimeError("El inicio del programa importo openpyxl o fallo")
+
+
+def carga_indice():
+    """Primera consulta de ocupacion con una conexion nueva (carga el indice)"""
+    bd.cerrar_conexiones()
+    obtener_indice()
+
+
+def _rango(hoy, dias):
+    return hoy.isoformat(), (hoy + datetime.timedelta(days=dias)).isoformat()
+
+
+def medir_operaciones(
+    repeticiones=20, repeticiones_exportar=3, semilla=0, hoy=None, repeticiones_inicio=5
+):
+    """Funcion que mide las operaciones frecuentes sobre la base de datos configurada.
+    Regresa un diccionario {operacion: estadisticas}"""
+    aleatorio = random.Random(semilla)
+    if hoy is None:
+        hoy = datetime.date.today()
+    salas = list(catalogo.salas())
+    turnos = list(catalogo.turnos())
+    futuro = [
+        (hoy + datetime.timedelta(days=dias)).isoformat() for dias in range(2, 180)
+    ]
+    inicio_mes, fin_mes = _rango(hoy, 30)
+    resultados = {}
+
+    resultados["inicio_programa"] = medir(inicio_programa, repeticiones_inicio)
+    resultados["arranque"] = medir(arranque, repeticiones)
+    resultados["carga_indice"] = medir(carga_indice, repeticiones)
+
+    espacios = [
+        (aleatorio.choice(salas), aleatorio.choice(futuro), aleatorio.choice(turnos))
+        for _ in range(1000)
+    ]
+
+    def verificar_choques():
+        indice = obtener_indice()
+        for id_sala, fecha, id_turno in espacios:
+            indice.ocupado(id_sala, fecha, id_turno)
+
+    resultados["verificar_choque"] = medir(verificar_choques, repeticiones, len(espacios))
+
+    resultados["salas_libres_mes"] = medir(
+        lambda: servicios.buscar_salas_libres(
+            hoy, hoy + datetime.timedelta(days=30), turnos[0], 0, hoy
+        ),
+        repeticiones,
+    )
+
+    resultados["consulta_rango_pagina"] = medir(
+        lambda: servicios.pagina_reservaciones(inicio_mes, fin_mes), repeticiones
+    )
+    resultados["consulta_rango_mes"] = medir(
+        lambda: sum(1 for _ in servicios.listar_reservaciones(inicio_mes, fin_mes)),
+        repeticiones,
+    )
+
+    def pantalla_cancelar():
+        paginador = servicios.PaginadorReservaciones(inicio_mes, fin_mes)
+        if paginador.siguiente():
+            paginador.buscar(paginador.pagina[-1][0])
+
+    resultados["pantalla_cancelar"] = medir(pantalla_cancelar, repeticiones)
+
+    with tempfile.TemporaryDirectory() as directorio:
+        exportadores = {
+            "exportar_csv": lambda: EscritorCSV(os.path.join(directorio, "r.csv")),
+            "exportar_excel": lambda: EscritorExcel(os.path.join(directorio, "r.xlsx")),
+            "exportar_json": lambda: EscritorJSON(os.path.join(directorio, "r.json")),
+        }
+        for nombre, crear in exportadores.items():
+            resultados[nombre] = medir(
+                lambda: exportar_reservaciones([crear()]), repeticiones_exportar
+            )
+    return resultados
@@ -0,0 +1,52 @@
+import datetime
+import os
+import platform
+import sqlite3
+import subprocess
+
+
+def version_codigo():
+    """Regresa el commit actual del repositorio, o None si no se puede obtener"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def crear_reporte(datos, operaciones, parametros):
+    """Funcion que arma el reporte en JSON de una corrida de mediciones"""
+    return {
+        "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+        "version": version_codigo(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "parametros": parametros,
+        "datos": datos,
+        "operaciones": operaciones,
+    }
+
+
+def comparar(reporte, anterior, tolerancia=0.2):
+    """Funcion que compara la mediana de cada operacion con un reporte anterior.
+    Regresa {operacion: {"anterior_ms", "actual_ms", "cambio", "regresion"}} donde
+    cambio es la proporcion actual/anterior y regresion indica si crecio mas que
+    la tolerancia"""
+    comparacion = {}
+    for nombre, actual in reporte["operaciones"].items():
+        previa = anterior.get("operaciones", {}).get(nombre)
+        if not previa or not previa["mediana_ms"]:
+            continue
+        cambio = actual["mediana_ms"] / previa["mediana_ms"]
+        comparacion[nombre] = {
+            "anterior_ms": previa["mediana_ms"],
+            "actual_ms": actual["mediana_ms"],
+            "cambio": round(cambio, 3),
+            "regresion": cambio > 1 + tolerancia,
+        }
+    return comparacion
@@ -0,0 +1,74 @@
+import threading
+
+from bd import obtener_conexion
+
+
+def version_catalogos(conexion):
+    """Funcion que regresa el contador de cambios de Salas y Turnos. Lo mantienen
+    los triggers de esas tablas, asi que es el mismo en todas las conexiones"""
+    return conexion.execute("SELECT version FROM VersionCatalogos").fetchone()[0]
+
+
+class CatalogoCache:
+    """Cache en memoria de los catalogos de Turnos y Salas como diccionarios por id.
+    Se invalida de forma explicita cuando este proceso registra salas y de forma
+    automatica cuando VersionCatalogos cambia, es decir, solo cuando alguien
+    modifica Salas o Turnos (no con cada reservacion)"""
+
+    def __init__(self):
+        self._candado = threading.RLock()
+        self._turnos = None
+        self._salas = None
+        self._version = None
+        self.aciertos = 0
+        self.fallos = 0
+
+    def invalidar(self):
+        """Descarta los catalogos para que se lean de nuevo en el siguiente acceso"""
+        with self._candado:
+            self._turnos = None
+            self._salas = None
+
+    def _sincronizar(self, conexion):
+        version = version_catalogos(conexion)
+        if self._version != version:
+            self._turnos = None
+            self._salas = None
+            self._version = version
+
+    def turnos(self, conexion=None):
+        """Regresa el diccionario {id_turno: turno}"""
+        conexion = conexion or obtener_conexion()
+        with self._candado:
+            self._sincronizar(conexion)
+            if self._turnos is None:
+                self.fallos += 1
+                cursor = conexion.cursor()
+                cursor.execute("SELECT id_turno, turno FROM Turnos ORDER BY id_turno")
+                self._turnos = dict(cursor.fetchall())
+            else:
+                self.aciertos += 1
+            return self._turnos
+
+    def salas(self, conexion=None):
+        """Regresa el diccionario {id_sala: (nombre, cupo)}"""
+        conexion = conexion or obtener_conexion()
+        with self._candado:
+            self._sincronizar(conexion)
+            if self._salas is None:
+                self.fallos += 1
+                cursor = conexion.cursor()
+                cursor.execute("SELECT id_sala, nombre, cupo FROM Salas ORDER BY id_sala")
+                self._salas = {
+                    id_sala: (nombre, cupo) for id_sala, nombre, cupo in cursor.fetchall()
+                }
+            else:
+                self.aciertos += 1
+            return self._salas
+
+    def estadisticas(self):
+        """Regresa los contadores de aciertos y fallos del cache"""
+        return {"aciertos": self.aciertos, "fallos": self.fallos}
+
+
+catalogo = CatalogoCache()
@@ -0,0 +1,309 @@
+"""Linea de comandos para usar los servicios del coworking sin el menu interactivo.
+
+Ejemplos:
+    python cli.py reserve --cliente 1 --sala 2 --fecha 03-15-2030 --turno 1 --evento Junta
+    python cli.py reserve --archivo reservaciones.csv
+    python cli.py cancel 10 11 12
+    python cli.py query --desde 01-01-2030 --hasta 12-31-2030
+    python cli.py export --formatos csv jsonl --desde 01-01-2030
+    python cli.py import clientes clientes.csv
+    python cli.py history --desde 01-01-2024 --hasta 12-31-2024 --cliente 3
+    python cli.py archive
+
+Cada comando escribe un resumen en JSON en la salida estandar (query escribe una
+reservacion por linea). Regresa 0 si todo se proceso, 2 si hubo registros
+rechazados y 1 si ocurrio un error.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import sys
+from sqlite3 import Error
+
+import servicios
+from archivo import TAMANO_LOTE_ARCHIVO, archivar
+from bd import a_fecha, configurar_bd
+from exportacion import (
+    FORMATOS_EXPORTAR,
+    TAMANO_LOTE,
+    crear_escritores,
+    exportar_reservaciones,
+)
+from instrumentacion import activar_desde_entorno
+from servicios import ErrorServicio
+
+
+def fecha_iso(texto):
+    """Convierte una fecha MM-DD-AAAA o AAAA-MM-DD de la linea de comandos a AAAA-MM-DD"""
+    try:
+        return servicios.convertir_fecha(texto).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"Formato de fecha incorrecto, use MM-DD-AAAA: {texto}"
+        )
+
+
+def leer_claves(ruta):
+    """Lee las claves de reservacion de un archivo de texto (una por linea),
+    CSV o JSON con la columna id_reservaciones"""
+    if os.path.splitext(ruta)[1].lower() in (".csv", ".json", ".jsonl"):
+        for registro in servicios.leer_registros(ruta):
+            yield registro.get("id_reservaciones") if isinstance(registro, dict) else registro
+    else:
+        with open(ruta, encoding="utf-8") as archivo:
+            for linea in archivo:
+                if linea.strip():
+                    yield linea.strip()
+
+
+def resumen_lote(clave, procesados, rechazos):
+    """Arma el resumen de una operacion por lotes"""
+    return {
+        clave: procesados,
+        "rechazados": len(rechazos),
+        "rechazos": [{"fila": fila, "motivo": motivo} for fila, motivo in rechazos],
+    }
+
+
+def comando_reserve(argumentos):
+    if argumentos.archivo:
+        registradas, rechazos = servicios.registrar_reservaciones_lote(
+            servicios.leer_registros(argumentos.archivo),
+            recorrer_domingos=argumentos.recorrer_domingos,
+        )
+        return resumen_lote("registradas", registradas, rechazos)
+    faltantes = [
+        opcion
+        for opcion in ("cliente", "sala", "fecha", "turno", "evento")
+        if getattr(argumentos, opcion) is None
+    ]
+    if faltantes:
+        raise ErrorServicio(
+            "Faltan opciones: " + ", ".join("--" + opcion for opcion in faltantes)
+        )
+    id_reservacion = servicios.reservar(
+        argumentos.cliente,
+        argumentos.sala,
+        argumentos.fecha,
+        argumentos.turno,
+        argumentos.evento,
+    )
+    return {"id_reservaciones": id_reservacion}
+
+
+def comando_cancel(argumentos):
+    claves = list(argumentos.claves)
+    if argumentos.archivo:
+        claves.extend(leer_claves(argumentos.archivo))
+    if not claves:
+        raise ErrorServicio("No se indicaron reservaciones para cancelar.")
+    canceladas, rechazos = servicios.cancelar_lote(claves)
+    return resumen_lote("canceladas", canceladas, rechazos)
+
+
+def comando_query(argumentos):
+    for id_reservacion, cliente, id_sala, fecha, turno, evento, _ in (
+        servicios.listar_reservaciones(
+            argumentos.desde, argumentos.hasta, completadas=True
+        )
+    ):
+        print(
+            json.dumps(
+                {
+                    "id_reservaciones": id_reservacion,
+                    "cliente": cliente,
+                    "id_sala": id_sala,
+                    "fecha": a_fecha(fecha).isoformat(),
+                    "turno": turno,
+                    "evento": evento,
+                },
+                ensure_ascii=False,
+            )
+        )
+    return None
+
+
+def comando_export(argumentos):
+    os.makedirs(argumentos.directorio, exist_ok=True)
+    escritores = crear_escritores(argumentos.formatos, argumentos.directorio)
+    filtro = {
+        "fecha_inicio": argumentos.desde,
+        "fecha_fin": argumentos.hasta,
+        "id_sala": argumentos.sala,
+        "id_cliente": argumentos.cliente,
+        "id_turno": argumentos.turno,
+    }
+    total = exportar_reservaciones(
+        escritores,
+        en_hilos=argumentos.hilos and len(escritores) > 1,
+        tamano_lote=argumentos.tamano_lote,
+        filtro=filtro,
+    )
+    errores = {escritor.ruta: str(escritor.error) for escritor in escritores if escritor.error}
+    if errores:
+        raise ErrorServicio(f"Error al exportar: {errores}")
+    return {
+        "exportadas": total,
+        "archivos": [escritor.ruta for escritor in escritores] if total else [],
+    }
+
+
+def comando_history(argumentos):
+    for fila in servicios.historial_reservaciones(
+        argumentos.desde, argumentos.hasta, argumentos.cliente
+    ):
+        id_reservacion, cliente, id_sala, fecha, turno, evento, estatus, cancelada_en = fila
+        print(
+            json.dumps(
+                {
+                    "id_reservaciones": id_reservacion,
+                    "cliente": cliente,
+                    "id_sala": id_sala,
+                    "fecha": a_fecha(fecha).isoformat(),
+                    "turno": turno,
+                    "evento": evento,
+                    "estatus": estatus,
+                    "cancelada_en": cancelada_en,
+                },
+                ensure_ascii=False,
+            )
+        )
+    return None
+
+
+def comando_archive(argumentos):
+    if argumentos.antes_de and argumentos.antes_de > datetime.date.today().isoformat():
+        raise ErrorServicio("--antes-de no puede ser una fecha futura.")
+    archivadas = archivar(
+        argumentos.antes_de, argumentos.tamano_lote, argumentos.maximo_lotes
+    )
+    return {"archivadas": archivadas}
+
+
+def comando_import(argumentos):
+    importadores = {
+        "clientes": servicios.importar_clientes,
+        "salas": servicios.importar_salas,
+        "reservaciones": servicios.importar_reservaciones,
+    }
+    insertados, rechazos = importadores[argumentos.tipo](argumentos.archivo)
+    return resumen_lote("importados", insertados, rechazos)
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(
+        description="Operaciones del coworking desde la linea de comandos"
+    )
+    parser.add_argument(
+        "--bd", help="Ruta de la base de datos (por omision COWORKING_DB o coworking.db)"
+    )
+    parser.add_argument(
+        "--trazas", help="Escribe al terminar las trazas de SQL y latencias en este JSON"
+    )
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    reserve = subparsers.add_parser("reserve", help="Registra reservaciones")
+    reserve.add_argument("--cliente", type=int)
+    reserve.add_argument("--sala", type=int)
+    reserve.add_argument("--fecha", help="MM-DD-AAAA o AAAA-MM-DD")
+    reserve.add_argument("--turno", type=int)
+    reserve.add_argument("--evento")
+    reserve.add_argument(
+        "--archivo",
+        help="CSV, JSON o JSON Lines con id_cliente, id_sala, fecha, id_turno y evento",
+    )
+    reserve.add_argument(
+        "--recorrer-domingos",
+        action=argparse.BooleanOptionalAction,
+        default=servicios.RECORRER_DOMINGOS,
+        help="En --archivo, mueve al lunes las reservaciones en domingo en vez de "
+        "rechazarlas (por omision si, igual que el servidor y la importacion)",
+    )
+    reserve.set_defaults(funcion=comando_reserve)
+
+    cancel = subparsers.add_parser("cancel", help="Cancela reservaciones")
+    cancel.add_argument("claves", nargs="*", help="Claves de las reservaciones")
+    cancel.add_argument("--archivo", help="Archivo con una clave por linea")
+    cancel.set_defaults(funcion=comando_cancel)
+
+    query = subparsers.add_parser(
+        "query",
+        help="Lista las reservaciones activas y completadas de un rango en JSON Lines",
+    )
+    query.add_argument("--desde", type=fecha_iso, required=True)
+    query.add_argument("--hasta", type=fecha_iso, required=True)
+    query.set_defaults(funcion=comando_query)
+
+    export = subparsers.add_parser(
+        "export", help="Exporta las reservaciones activas y completadas"
+    )
+    export.add_argument(
+        "--formatos", nargs="+", choices=FORMATOS_EXPORTAR, default=["csv"]
+    )
+    export.add_argument("--directorio", default=".")
+    export.add_argument("--desde", type=fecha_iso)
+    export.add_argument("--hasta", type=fecha_iso)
+    export.add_argument("--sala", type=int)
+    export.add_argument("--cliente", type=int)
+    export.add_argument("--turno", type=int)
+    export.add_argument("--tamano-lote", type=int, default=TAMANO_LOTE)
+    export.add_argument(
+        "--hilos", action="store_true", help="Un hilo por formato de exportacion"
+    )
+    export.set_defaults(funcion=comando_export)
+
+    history = subparsers.add_parser(
+        "history",
+        help="Lista todas las reservaciones de un rango, incluidas las canceladas y archivadas",
+    )
+    history.add_argument("--desde", type=fecha_iso, required=True)
+    history.add_argument("--hasta", type=fecha_iso, required=True)
+    history.add_argument("--cliente", type=int)
+    history.set_defaults(funcion=comando_history)
+
+    archive = subparsers.add_parser(
+        "archive",
+        help="Mueve al archivo las reservaciones canceladas y pasadas (para cron)",
+    )
+    archive.add_argument(
+        "--antes-de", type=fecha_iso, help="Archiva las anteriores a esta fecha, hoy o antes (por omision hoy)"
+    )
+    archive.add_argument("--tamano-lote", type=int, default=TAMANO_LOTE_ARCHIVO)
+    archive.add_argument(
+        "--maximo-lotes", type=int, help="Limita los lotes de esta corrida"
+    )
+    archive.set_defaults(funcion=comando_archive)
+
+    importar = subparsers.add_parser(
+        "import", help="Importa clientes, salas o reservaciones desde un archivo"
+    )
+    importar.add_argument("tipo", choices=("clientes", "salas", "reservaciones"))
+    importar.add_argument("archivo", help="Archivo .csv, .json o .jsonl")
+    importar.set_defaults(funcion=comando_import)
+    return parser
+
+
+def main(argv=None):
+    argumentos = crear_parser().parse_args(argv)
+    if argumentos.bd:
+        configurar_bd(argumentos.bd)
+    activar_desde_entorno(argumentos.trazas)
+    try:
+        avisos = []
+        servicios.crear_esquema(avisos)
+        for aviso in avisos:
+            print(json.dumps({"aviso": aviso}, ensure_ascii=False), file=sys.stderr)
+        resultado = argumentos.funcion(argumentos)
+    except (ErrorServicio, Error, OSError, ValueError) as e:
+        print(json.dumps({"error": str(e)}, ensure_ascii=False), file=sys.stderr)
+        return 1
+    if resultado is None:
+        return 0
+    print(json.dumps(resultado, ensure_ascii=False))
+    return 2 if resultado.get("rechazados") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
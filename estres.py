@@ -0,0 +1,183 @@
+"""Prueba de estres de escritores concurrentes en varios procesos.
+
+Varios procesos intentan reservar los mismos espacios (sala, fecha, turno) y
+despues cancelar las mismas reservaciones sobre una base de datos nueva. Al final
+se verifica que no se perdio ni se duplico ninguna operacion:
+    - cada espacio quedo reservado exactamente una vez,
+    - las reservaciones que los procesos reportan como registradas son las que
+      existen en la base de datos,
+    - cada reservacion se cancelo una sola vez,
+    - ningun proceso termino con 'database is locked'.
+
+    python estres.py --procesos 8 --espacios 300
+"""
+
+import argparse
+import datetime
+import json
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from sqlite3 import OperationalError
+
+import bd
+import servicios
+
+PRIMER_DIA = datetime.date(2099, 1, 5)
+
+
+def espacios_prueba(cantidad, salas, turnos=3):
+    """Regresa 'cantidad' espacios (id_sala, fecha, id_turno) sin domingos"""
+    espacios = []
+    dia = PRIMER_DIA
+    while len(espacios) < cantidad:
+        if dia.weekday() != 6:
+            for id_sala in range(1, salas + 1):
+                for id_turno in range(1, turnos + 1):
+                    espacios.append((id_sala, dia.isoformat(), id_turno))
+        dia += datetime.timedelta(days=1)
+    return espacios[:cantidad]
+
+
+def _preparar(ruta, salas):
+    bd.configurar_bd(ruta)
+    servicios.crear_esquema()
+    servicios.registrar_cliente("Prueba", "Estres")
+    for numero in range(1, salas + 1):
+        servicios.registrar_sala(f"Sala {chr(64 + numero)}", 10)
+    bd.cerrar_conexiones()
+
+
+def _reservar(ruta, espacios, desplazamiento):
+    """Proceso escritor: intenta reservar todos los espacios empezando en un punto
+    distinto para que los procesos choquen en todo momento"""
+    bd.configurar_bd(ruta)
+    registradas = []
+    ocupadas = 0
+    bloqueos = 0
+    orden = espacios[desplazamiento:] + espacios[:desplazamiento]
+    for id_sala, fecha, id_turno in orden:
+        try:
+            registradas.append(
+                servicios.reservar(1, id_sala, fecha, id_turno, "Estres")
+            )
+        except servicios.ErrorServicio:
+            ocupadas += 1
+        except OperationalError as e:
+            if not bd.bloqueada(e):
+                raise
+            bloqueos += 1
+    return registradas, ocupadas, bloqueos
+
+
+def _cancelar(ruta, ids, tamano_lote):
+    """Proceso escritor: cancela todas las reservaciones en lotes pequenos"""
+    bd.configurar_bd(ruta)
+    canceladas = 0
+    bloqueos = 0
+    for inicio in range(0, len(ids), tamano_lote):
+        try:
+            canceladas += servicios.cancelar_lote(ids[inicio : inicio + tamano_lote])[0]
+        except OperationalError as e:
+            if not bd.bloqueada(e):
+                raise
+            bloqueos += 1
+    return canceladas, bloqueos
+
+
+def verificar_escritores_concurrentes(procesos=4, espacios=200, salas=3, ruta=None):
+    """Funcion que ejecuta la prueba de estres y regresa un diccionario con el
+    resultado; la llave 'correcto' indica si se cumplieron todas las condiciones"""
+    temporal = None
+    if ruta is None:
+        temporal = tempfile.TemporaryDirectory()
+        ruta = os.path.join(temporal.name, "estres.db")
+    try:
+        _preparar(ruta, salas)
+        lista = espacios_prueba(espacios, salas)
+        paso = max(1, len(lista) // procesos)
+        with ProcessPoolExecutor(procesos) as grupo:
+            resultados = list(
+                grupo.map(
+                    _reservar,
+                    [ruta] * procesos,
+                    [lista] * procesos,
+                    [numero * paso for numero in range(procesos)],
+                )
+            )
+        registradas = [
+            id_reservacion for ids, _, _ in resultados for id_reservacion in ids
+        ]
+        bloqueos_reservar = sum(bloqueos for _, _, bloqueos in resultados)
+
+        bd.configurar_bd(ruta)
+        with bd.obtener_conexion() as conexion:
+            cursor = conexion.cursor()
+            cursor.execute(
+                "SELECT id_reservaciones FROM Reservaciones WHERE estatus = 'Activa'"
+            )
+            en_bd = sorted(fila[0] for fila in cursor.fetchall())
+            cursor.execute(
+                """SELECT count(*) FROM (SELECT 1 FROM Reservaciones WHERE estatus = 'Activa'
+                   GROUP BY id_sala, fecha, id_turno HAVING count(*) > 1)"""
+            )
+            duplicados = cursor.fetchone()[0]
+        bd.cerrar_conexiones()
+
+        with ProcessPoolExecutor(procesos) as grupo:
+            cancelaciones = list(
+                grupo.map(
+                    _cancelar, [ruta] * procesos, [en_bd] * procesos, [10] * procesos
+                )
+            )
+        canceladas = sum(cantidad for cantidad, _ in cancelaciones)
+        bloqueos_cancelar = sum(bloqueos for _, bloqueos in cancelaciones)
+
+        bd.configurar_bd(ruta)
+        with bd.obtener_conexion() as conexion:
+            cursor = conexion.cursor()
+            cursor.execute("SELECT count(*) FROM Reservaciones WHERE estatus = 'Activa'")
+            activas = cursor.fetchone()[0]
+        bd.cerrar_conexiones()
+
+        reporte = {
+            "procesos": procesos,
+            "espacios": len(lista),
+            "registradas": len(registradas),
+            "en_bd": len(en_bd),
+            "duplicados": duplicados,
+            "canceladas": canceladas,
+            "activas_al_final": activas,
+            "bloqueos": bloqueos_reservar + bloqueos_cancelar,
+        }
+        reporte["correcto"] = (
+            sorted(registradas) == en_bd
+            and len(en_bd) == len(lista)
+            and duplicados == 0
+            and canceladas == len(en_bd)
+            and activas == 0
+            and reporte["bloqueos"] == 0
+        )
+        return reporte
+    finally:
+        if temporal is not None:
+            temporal.cleanup()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--procesos", type=int, default=4)
+    parser.add_argument("--espacios", type=int, default=200)
+    parser.add_argument("--salas", type=int, default=3)
+    parser.add_argument("--bd", help="Ruta de una base de datos nueva para la prueba")
+    argumentos = parser.parse_args(argv)
+    reporte = verificar_escritores_concurrentes(
+        argumentos.procesos, argumentos.espacios, argumentos.salas, argumentos.bd
+    )
+    print(json.dumps(reporte, indent=2))
+    return 0 if reporte["correcto"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,352 @@
+import csv
+import json
+import os
+import queue
+import threading
+
+from bd import DIFERENCIA_JULIANA, a_dia, obtener_conexion
+from instrumentacion import instrumentar
+
+# Reservaciones activas y las completadas que ya se movieron al archivo (ver
+# archivo.py). SQLite aplica los filtros de fecha dentro de cada parte y las une
+# en orden con sus indices de fecha (MERGE UNION ALL)
+ORIGEN_ACTIVAS_Y_COMPLETADAS = """(SELECT id_reservaciones, id_cliente, id_sala, fecha, id_turno, evento, estatus
+             FROM Reservaciones WHERE estatus = 'Activa'
+             UNION ALL
+             SELECT id_reservaciones, id_cliente, id_sala, fecha, id_turno, evento, estatus
+             FROM ReservacionesArchivo WHERE estatus = 'Completada')"""
+
+# La fecha se formatea fuera de la subconsulta: una expresion sobre r.fecha en la
+# misma consulta impide que SQLite una las dos partes de ORIGEN_ACTIVAS_Y_COMPLETADAS
+# en orden y lo obliga a materializar y ordenar todo antes de la primera fila
+CONSULTA_EXPORTAR_BASE = """SELECT id_reservaciones, nombre_cliente, nombre_sala,
+              strftime('%m-%d-%Y', fecha + {diferencia}) AS fecha, turno, evento
+       FROM (SELECT r.id_reservaciones,
+                    c.nombre || ' ' || c.apellido AS nombre_cliente,
+                    s.nombre AS nombre_sala,
+                    r.fecha,
+                    t.turno,
+                    r.evento
+             FROM {origen} r
+             JOIN Clientes c ON r.id_cliente = c.id_cliente
+             JOIN Salas s ON r.id_sala = s.id_sala
+             JOIN Turnos t ON r.id_turno = t.id_turno
+             WHERE {condiciones}
+             ORDER BY r.fecha, r.id_reservaciones)"""
+
+# Segunda pasada, solo si hay un escritor de Excel: la hoja de solo escritura
+# necesita los anchos de columna antes de la primera fila
+CONSULTA_ANCHOS_EXCEL = """SELECT count(*), coalesce(max(length(id_reservaciones)), 0),
+              coalesce(max(length(nombre_cliente)), 0), coalesce(max(length(nombre_sala)), 0),
+              coalesce(max(length(fecha)), 0), coalesce(max(length(turno)), 0),
+              coalesce(max(length(evento)), 0)
+       FROM ({consulta})"""
+
+FILTROS_EXPORTAR = {
+    "fecha_inicio": "r.fecha >= ?",
+    "fecha_fin": "r.fecha <= ?",
+    "id_sala": "r.id_sala = ?",
+    "id_cliente": "r.id_cliente = ?",
+    "id_turno": "r.id_turno = ?",
+}
+
+
+def construir_consulta_exportar(filtro=None):
+    """Funcion que arma la consulta de exportacion con los filtros indicados.
+    filtro es un diccionario con cualquiera de las llaves de FILTROS_EXPORTAR;
+    las fechas pueden ser datetime.date, texto AAAA-MM-DD o numero de dia.
+    Regresa la consulta y sus parametros"""
+    condiciones = []
+    parametros = []
+    for llave, valor in (filtro or {}).items():
+        if llave not in FILTROS_EXPORTAR:
+            raise ValueError(f"Filtro de exportacion no valido: {llave}")
+        if valor is not None:
+            condiciones.append(FILTROS_EXPORTAR[llave])
+            parametros.append(a_dia(valor) if llave.startswith("fecha") else valor)
+    consulta = CONSULTA_EXPORTAR_BASE.format(
+        origen=ORIGEN_ACTIVAS_Y_COMPLETADAS,
+        condiciones=" AND ".join(condiciones) or "1",
+        diferencia=DIFERENCIA_JULIANA,
+    )
+    return consulta, tuple(parametros)
+
+
+CONSULTA_EXPORTAR = construir_consulta_exportar()[0]
+
+TAMANO_LOTE = 1000
+
+ANCHOS_CSV = (7, 30, 20, 12, 10, 25)
+
+CLAVES_JSON = ("Clave", "Cliente", "Sala", "Fecha", "Turno", "Evento")
+
+
+class EscritorCSV:
+    """Escritor de reservaciones a CSV con columnas de ancho fijo"""
+
+    requiere_anchos = False
+
+    def __init__(self, ruta="Reservaciones.csv"):
+        self.ruta = ruta
+        self.error = None
+
+    def abrir(self, anchos):
+        self._archivo = open(self.ruta, mode="w", encoding="utf-8", newline="")
+        self._writer = csv.writer(self._archivo)
+        encabezados = ["Clave", "Cliente", "Sala", "Fecha", "Turno", "Evento"]
+        self._writer.writerow(
+            [encabezado.ljust(ancho) for encabezado, ancho in zip(encabezados, ANCHOS_CSV)]
+        )
+        self._writer.writerow(["-" * ancho for ancho in ANCHOS_CSV])
+
+    def escribir(self, lote):
+        self._writer.writerows(
+            [str(valor).ljust(ancho) for valor, ancho in zip(fila, ANCHOS_CSV)]
+            for fila in lote
+        )
+
+    def cerrar(self):
+        self._archivo.close()
+
+
+class EscritorExcel:
+    """Escritor de reservaciones a Excel con una hoja de solo escritura.
+    Los anchos de columna se reciben al abrir, porque el formato de solo
+    escritura los necesita antes de la primera fila. openpyxl se importa al abrir
+    y no al cargar el modulo, porque tarda mas que el resto del arranque"""
+
+    requiere_anchos = True
+    titulo = "REPORTE DE RESERVACIONES"
+    encabezados = ["Clave Reservacion", "Cliente", "Sala", "Fecha", "Turno", "Evento"]
+
+    def __init__(self, ruta="DatosReservaciones.xlsx"):
+        self.ruta = ruta
+        self.error = None
+
+    def abrir(self, anchos):
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font, Alignment, Border, Side
+        from openpyxl.utils import get_column_letter
+
+        self._wb = Workbook(write_only=True)
+        ws = self._ws = self._wb.create_sheet("Reservaciones")
+
+        anchos = list(anchos)
+        anchos[0] = max(anchos[0], len(self.titulo))
+        for col, (encabezado, ancho) in enumerate(
+            zip(self.encabezados, anchos), start=1
+        ):
+            ws.column_dimensions[get_column_letter(col)].width = (
+                max(ancho, len(encabezado)) + 3
+            )
+
+        ws.merged_cells.add("A1:F1")
+        celda_titulo = WriteOnlyCell(ws, value=self.titulo)
+        celda_titulo.font = Font(bold=True, size=14)
+        celda_titulo.alignment = Alignment(horizontal="center")
+        ws.append([celda_titulo])
+        ws.append([])
+
+        negrita = Font(bold=True)
+        borde_grueso = Border(bottom=Side(style="thick"))
+        alineado = Alignment(horizontal="center")
+
+        fila_encabezados = []
+        for encabezado in self.encabezados:
+            celda = WriteOnlyCell(ws, value=encabezado)
+            celda.font = negrita
+            celda.alignment = alineado
+            celda.border = borde_grueso
+            fila_encabezados.append(celda)
+        ws.append(fila_encabezados)
+
+        # Las celdas de datos se reutilizan en cada fila: el estilo se asigna una
+        # sola vez y openpyxl escribe cada fila en cuanto se agrega.
+        self._celdas = []
+        for _ in self.encabezados:
+            celda = WriteOnlyCell(ws)
+            celda.alignment = alineado
+            self._celdas.append(celda)
+
+    def escribir(self, lote):
+        for dato in lote:
+            for celda, valor in zip(self._celdas, dato):
+                celda.value = valor
+            self._ws.append(self._celdas)
+
+    def cerrar(self):
+        self._wb.save(self.ruta)
+
+
+class EscritorJSON:
+    """Escritor de reservaciones a JSON que emite el arreglo elemento por elemento.
+    formato="json" genera un arreglo; formato="jsonl" genera un objeto por linea (JSON Lines).
+    compacto=True omite la indentacion"""
+
+    requiere_anchos = False
+
+    def __init__(self, ruta=None, formato="json", compacto=False):
+        if ruta is None:
+            ruta = (
+                "ReservacionesJSON.jsonl" if formato == "jsonl" else "ReservacionesJSON.json"
+            )
+        self.ruta = ruta
+        self.formato = formato
+        self.compacto = compacto
+        self.error = None
+        if compacto or formato == "jsonl":
+            self._opciones = {"separators": (",", ":"), "ensure_ascii": False}
+        else:
+            self._opciones = {"indent": 4, "ensure_ascii": False}
+
+    def abrir(self, anchos):
+        self._archivo = open(self.ruta, "w", encoding="utf-8")
+        if self.formato == "json":
+            self._archivo.write("[" if self.compacto else "[\n")
+        self._separador = ""
+
+    def escribir(self, lote):
+        for fila in lote:
+            elemento = json.dumps(dict(zip(CLAVES_JSON, fila)), **self._opciones)
+            if self.formato == "jsonl":
+                self._archivo.write(elemento + "\n")
+            elif self.compacto:
+                self._archivo.write(self._separador + elemento)
+            else:
+                self._archivo.write(
+                    self._separador + "    " + elemento.replace("\n", "\n    ")
+                )
+            self._separador = "," if self.compacto else ",\n"
+
+    def cerrar(self):
+        if self.formato == "json":
+            self._archivo.write("]" if self.compacto else "\n]")
+        self._archivo.close()
+
+
+FORMATOS_EXPORTAR = ("csv", "excel", "json", "jsonl")
+
+
+def crear_escritores(formatos, directorio="."):
+    """Funcion que crea un escritor por cada formato (sin repetir) con su nombre de
+    archivo habitual dentro del directorio indicado"""
+    escritores = []
+    for formato in dict.fromkeys(formatos):
+        if formato == "csv":
+            escritores.append(EscritorCSV(os.path.join(directorio, "Reservaciones.csv")))
+        elif formato == "excel":
+            escritores.append(
+                EscritorExcel(os.path.join(directorio, "DatosReservaciones.xlsx"))
+            )
+        elif formato in ("json", "jsonl"):
+            escritores.append(
+                EscritorJSON(
+                    os.path.join(directorio, f"ReservacionesJSON.{formato}"), formato
+                )
+            )
+        else:
+            raise ValueError(f"Formato de exportacion no valido: {formato}")
+    return escritores
+
+
+def _consumir_lotes(escritor, cola):
+    """Funcion que escribe los lotes que llegan por la cola hasta recibir None y
+    cierra el escritor aunque falle"""
+    try:
+        while True:
+            lote = cola.get()
+            if lote is None:
+                break
+            escritor.escribir(lote)
+    except Exception as e:
+        escritor.error = e
+        while cola.get() is not None:
+            pass
+    finally:
+        try:
+            escritor.cerrar()
+        except Exception as e:
+            escritor.error = escritor.error or e
+
+
+def _cerrar_escritores(escritores):
+    """Funcion que cierra todos los escritores aunque alguno falle y despues
+    propaga el primer error"""
+    error = None
+    for escritor in escritores:
+        try:
+            escritor.cerrar()
+        except Exception as e:
+            error = error or e
+    if error is not None:
+        raise error
+
+
+@instrumentar()
+def exportar_reservaciones(
+    escritores, en_hilos=False, tamano_lote=TAMANO_LOTE, lotes_en_cola=8, filtro=None
+):
+    """Funcion que ejecuta la consulta de exportacion una sola vez y reparte cada lote
+    de filas a todos los escritores; si alguno es de Excel, antes se calculan los
+    anchos de columna con CONSULTA_ANCHOS_EXCEL, que es otra pasada. Con
+    en_hilos=True cada escritor trabaja en su propio hilo con una cola de
+    lotes_en_cola lotes, para que uno lento no detenga a los demas. filtro limita
+    las reservaciones exportadas (ver construir_consulta_exportar). Regresa el
+    numero de reservaciones exportadas (0 si no hay ninguna); el error de un
+    escritor en su hilo queda en su atributo error"""
+    total = 0
+    consulta, parametros = construir_consulta_exportar(filtro)
+    with obtener_conexion() as conexion:
+        cursor = conexion.cursor()
+        anchos = None
+        if any(escritor.requiere_anchos for escritor in escritores):
+            cursor.execute(CONSULTA_ANCHOS_EXCEL.format(consulta=consulta), parametros)
+            cantidad, *anchos = cursor.fetchone()
+            if cantidad == 0:
+                return 0
+
+        cursor.execute(consulta, parametros)
+        lote = cursor.fetchmany(tamano_lote)
+        if not lote:
+            return 0
+
+        abiertos = []
+        try:
+            for escritor in escritores:
+                escritor.abrir(anchos)
+                abiertos.append(escritor)
+        except BaseException:
+            _cerrar_escritores(abiertos)
+            raise
+
+        if not en_hilos:
+            try:
+                while lote:
+                    for escritor in escritores:
+                        escritor.escribir(lote)
+                    total += len(lote)
+                    lote = cursor.fetchmany(tamano_lote)
+            finally:
+                _cerrar_escritores(escritores)
+            return total
+
+        colas = [queue.Queue(maxsize=lotes_en_cola) for _ in escritores]
+        hilos = [
+            threading.Thread(target=_consumir_lotes, args=(escritor, cola))
+            for escritor, cola in zip(escritores, colas)
+        ]
+        for hilo in hilos:
+            hilo.start()
+        try:
+            while lote:
+                for cola in colas:
+                    cola.put(lote)
+                total += len(lote)
+                lote = cursor.fetchmany(tamano_lote)
+        finally:
+            for cola in colas:
+                cola.put(None)
+            for hilo in hilos:
+                hilo.join()
+    return total
@@ -0,0 +1,279 @@
+"""Trazas de SQL y latencia por operacion.
+
+Cuando se activa, cada conexion abierta por bd recibe un set_trace_callback que
+registra las sentencias que ejecuta SQLite (incluidas BEGIN, COMMIT y los
+pragmas). La duracion de una sentencia va desde que empieza hasta que la misma
+conexion empieza otra o termina la operacion que la contiene, por lo que incluye
+el tiempo de leer sus filas. Las operaciones son las funciones decoradas con
+@instrumentar (las opciones del menu y los servicios). Se guardan histogramas de
+latencia por sentencia y por operacion, las filas modificadas y un registro de
+las sentencias mas lentas que el umbral. El reporte incluye tambien los aciertos
+y fallos del cache de catalogos (desde que inicio el proceso).
+
+Desactivada no instala ningun callback y cada funcion decorada solo revisa una
+bandera antes de ejecutarse.
+
+    COWORKING_TRAZAS=trazas.json python PIA_prueba.py
+    COWORKING_UMBRAL_LENTA_MS=50 python cli.py --trazas trazas.json query ...
+"""
+
+import atexit
+import collections
+import datetime
+import functools
+import json
+import os
+import re
+import threading
+import time
+
+import bd
+from catalogo import catalogo
+
+LIMITES_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+ETIQUETAS_CUBETAS = [f"<={limite}" for limite in LIMITES_MS] + [f">{LIMITES_MS[-1]}"]
+
+UMBRAL_LENTA_MS = float(os.environ.get("COWORKING_UMBRAL_LENTA_MS", 100))
+
+MAXIMO_LENTAS = 200
+
+_LITERALES = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_ESPACIOS = re.compile(r"\s+")
+
+
+def normalizar(sql):
+    """Reemplaza los valores literales por ? para agrupar sentencias iguales"""
+    return _ESPACIOS.sub(" ", _LITERALES.sub("?", sql)).strip()
+
+
+class Histograma:
+    """Histograma de latencias en milisegundos con cubetas fijas (LIMITES_MS)"""
+
+    def __init__(self):
+        self.cubetas = [0] * (len(LIMITES_MS) + 1)
+        self.cuenta = 0
+        self.total_ms = 0.0
+        self.maximo_ms = 0.0
+        self.filas = 0
+
+    def registrar(self, ms, filas=0):
+        posicion = 0
+        while posicion < len(LIMITES_MS) and ms > LIMITES_MS[posicion]:
+            posicion += 1
+        self.cubetas[posicion] += 1
+        self.cuenta += 1
+        self.total_ms += ms
+        self.filas += filas
+        if ms > self.maximo_ms:
+            self.maximo_ms = ms
+
+    def percentil(self, proporcion):
+        """Limite superior de la cubeta donde cae el percentil indicado"""
+        objetivo = proporcion * self.cuenta
+        acumulado = 0
+        for posicion, cantidad in enumerate(self.cubetas):
+            acumulado += cantidad
+            if cantidad and acumulado >= objetivo:
+                if posicion < len(LIMITES_MS):
+                    return LIMITES_MS[posicion]
+                return round(self.maximo_ms, 3)
+        return 0
+
+    def a_dict(self):
+        return {
+            "cuenta": self.cuenta,
+            "total_ms": round(self.total_ms, 3),
+            "promedio_ms": round(self.total_ms / self.cuenta, 3) if self.cuenta else 0,
+            "p50_ms": self.percentil(0.5),
+            "p95_ms": self.percentil(0.95),
+            "p99_ms": self.percentil(0.99),
+            "maximo_ms": round(self.maximo_ms, 3),
+            "filas_modificadas": self.filas,
+            "cubetas": {
+                etiqueta: cantidad
+                for etiqueta, cantidad in zip(ETIQUETAS_CUBETAS, self.cubetas)
+                if cantidad
+            },
+        }
+
+
+class Instrumentacion:
+    """Recolector de trazas de SQL y latencias por operacion"""
+
+    def __init__(self):
+        self.activa = False
+        self.umbral_ms = UMBRAL_LENTA_MS
+        self._candado = threading.Lock()
+        self._local = threading.local()
+        self._en_curso = {}
+        self._instalar = self._instalar_conexion
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Borra las mediciones acumuladas"""
+        with self._candado:
+            self.sentencias = collections.defaultdict(Histograma)
+            self.operaciones = collections.defaultdict(Histograma)
+            self.lentas = collections.deque(maxlen=MAXIMO_LENTAS)
+            self.desde = datetime.datetime.now().isoformat(timespec="seconds")
+
+    def activar(self, umbral_ms=None, volcar_en=None):
+        """Empieza a registrar. Si volcar_en es una ruta, el JSON se escribe al salir"""
+        if umbral_ms is not None:
+            self.umbral_ms = umbral_ms
+        if volcar_en:
+            atexit.register(self.volcar, volcar_en)
+        if not self.activa:
+            self.activa = True
+            bd.al_abrir(self._instalar)
+
+    def desactivar(self):
+        """Deja de registrar y quita el callback de las conexiones"""
+        if self.activa:
+            self.activa = False
+            bd.quitar_al_abrir(self._instalar, self._desinstalar_conexion)
+            with self._candado:
+                for conexion in list(self._en_curso):
+                    self._cerrar_sentencia(conexion, time.perf_counter())
+
+    def _instalar_conexion(self, conexion):
+        conexion.set_trace_callback(functools.partial(self._sentencia, conexion))
+
+    def _desinstalar_conexion(self, conexion):
+        conexion.set_trace_callback(None)
+
+    def _operacion_actual(self):
+        pila = getattr(self._local, "pila", None)
+        return pila[-1] if pila else None
+
+    def _sentencia(self, conexion, sql):
+        ahora = time.perf_counter()
+        with self._candado:
+            self._cerrar_sentencia(conexion, ahora)
+            self._en_curso[conexion] = (
+                sql,
+                ahora,
+                conexion.total_changes,
+                threading.get_ident(),
+                self._operacion_actual(),
+            )
+
+    def _cerrar_sentencia(self, conexion, ahora):
+        en_curso = self._en_curso.pop(conexion, None)
+        if en_curso is None:
+            return
+        sql, inicio, cambios, _, operacion = en_curso
+        ms = (ahora - inicio) * 1000
+        try:
+            filas = conexion.total_changes - cambios
+        except Exception:
+            filas = 0
+        self.sentencias[normalizar(sql)].registrar(ms, filas)
+        if operacion is not None:
+            self.operaciones[operacion].filas += filas
+        if ms >= self.umbral_ms:
+            self.lentas.append(
+                {
+                    "fecha": datetime.datetime.now().isoformat(timespec="milliseconds"),
+                    "ms": round(ms, 3),
+                    "operacion": operacion,
+                    "filas_modificadas": filas,
+                    "sql": sql[:1000],
+                }
+            )
+
+    def _cerrar_sentencias_del_hilo(self, ahora):
+        hilo = threading.get_ident()
+        with self._candado:
+            for conexion, en_curso in list(self._en_curso.items()):
+                if en_curso[3] == hilo:
+                    self._cerrar_sentencia(conexion, ahora)
+
+    def operacion(self, nombre):
+        """Contexto que mide una operacion; las operaciones pueden anidarse"""
+        return _Operacion(self, nombre)
+
+    def reporte(self):
+        """Regresa las mediciones como diccionario"""
+        if self.activa:
+            self._cerrar_sentencias_del_hilo(time.perf_counter())
+        with self._candado:
+            return {
+                "desde": self.desde,
+                "hasta": datetime.datetime.now().isoformat(timespec="seconds"),
+                "umbral_lenta_ms": self.umbral_ms,
+                "operaciones": {
+                    nombre: histograma.a_dict()
+                    for nombre, histograma in sorted(self.operaciones.items())
+                },
+                "sentencias": {
+                    sql: histograma.a_dict()
+                    for sql, histograma in sorted(
+                        self.sentencias.items(),
+                        key=lambda elemento: -elemento[1].total_ms,
+                    )
+                },
+                "lentas": list(self.lentas),
+                "catalogo": catalogo.estadisticas(),
+            }
+
+    def volcar(self, ruta):
+        """Escribe el reporte en un archivo JSON"""
+        with open(ruta, "w", encoding="utf-8") as archivo:
+            json.dump(self.reporte(), archivo, indent=2, ensure_ascii=False)
+
+
+class _Operacion:
+    def __init__(self, instrumentacion, nombre):
+        self.instrumentacion = instrumentacion
+        self.nombre = nombre
+
+    def __enter__(self):
+        local = self.instrumentacion._local
+        if not hasattr(local, "pila"):
+            local.pila = []
+        local.pila.append(self.nombre)
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *error):
+        instrumentacion = self.instrumentacion
+        ahora = time.perf_counter()
+        instrumentacion._cerrar_sentencias_del_hilo(ahora)
+        instrumentacion._local.pila.pop()
+        with instrumentacion._candado:
+            instrumentacion.operaciones[self.nombre].registrar(
+                (ahora - self.inicio) * 1000
+            )
+        return False
+
+
+instrumentacion = Instrumentacion()
+
+
+def instrumentar(nombre=None):
+    """Decorador que mide cada llamada a la funcion como una operacion cuando la
+    instrumentacion esta activa"""
+
+    def decorador(funcion):
+        etiqueta = nombre or funcion.__name__
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not instrumentacion.activa:
+                return funcion(*args, **kwargs)
+            with instrumentacion.operacion(etiqueta):
+                return funcion(*args, **kwargs)
+
+        return envoltura
+
+    return decorador
+
+
+def activar_desde_entorno(ruta=None):
+    """Activa la instrumentacion si se indica una ruta o la variable COWORKING_TRAZAS;
+    el reporte se escribe en esa ruta al salir"""
+    ruta = ruta or os.environ.get("COWORKING_TRAZAS")
+    if ruta:
+        instrumentacion.activar(volcar_en=ruta)
@@ -0,0 +1,361 @@
+"""Migraciones del esquema de la base de datos.
+
+La version del esquema se guarda en PRAGMA user_version. Al iniciar, migrar()
+aplica en orden las migraciones de MIGRACIONES con version mayor a la guardada.
+Cada paso corre en su propia transaccion de escritura y la version se guarda en
+la transaccion del ultimo paso. Si el programa se interrumpe a la mitad, la
+migracion se repite completa, por lo que los pasos deben poder ejecutarse mas de
+una vez (IF NOT EXISTS, revisar el tipo de una columna, rellenar solo las filas
+pendientes).
+
+Los rellenos de tablas grandes se hacen con RellenoPorLotes: cada lote de filas
+se confirma en su propia transaccion para no retener el candado de escritura
+durante toda la migracion. Para agregar una migracion se agrega al final:
+
+    Migracion(5, "Fecha de registro", [
+        agregar_columna("Reservaciones", "registrada", "TEXT"),
+        RellenoPorLotes("Reservaciones", "registrada = datetime('now')", "registrada IS NULL"),
+    ])
+"""
+
+import time
+from sqlite3 import DatabaseError, OperationalError
+
+from bd import DIFERENCIA_JULIANA, obtener_conexion, transaccion_escritura
+
+TAMANO_LOTE_MIGRACION = 5000
+
+PAUSA_ENTRE_LOTES = 0.01
+
+
+class ErrorMigracion(DatabaseError):
+    """Error al migrar el esquema, por ejemplo si la base de datos es mas nueva
+    que el programa"""
+
+
+class Migracion:
+    """Migracion del esquema a la version indicada. pasos es una lista de funciones
+    paso(cursor) y de RellenoPorLotes que se ejecutan en orden. Un paso puede
+    regresar un aviso (texto) para el usuario, por ejemplo si tuvo que corregir datos"""
+
+    def __init__(self, version, descripcion, pasos):
+        self.version = version
+        self.descripcion = descripcion
+        self.pasos = list(pasos)
+        if not self.pasos or isinstance(self.pasos[-1], RellenoPorLotes):
+            self.pasos.append(_sin_cambios)
+
+    def aplicar(self, conexion, avisos=None):
+        """Ejecuta los pasos y guarda la version. Los avisos de los pasos confirmados
+        se agregan a la lista avisos. Regresa False si otro proceso termino la
+        migracion antes"""
+        for posicion, paso in enumerate(self.pasos, 1):
+            if isinstance(paso, RellenoPorLotes):
+                paso.aplicar(conexion)
+                continue
+            with transaccion_escritura(conexion):
+                if version_esquema(conexion) >= self.version:
+                    return False
+                aviso = paso(conexion.cursor())
+                if posicion == len(self.pasos):
+                    conexion.execute(f"PRAGMA user_version = {self.version}")
+            if aviso and avisos is not None:
+                avisos.append(aviso)
+        return True
+
+
+class RellenoPorLotes:
+    """Paso que ejecuta 'UPDATE tabla SET asignacion WHERE pendiente' por lotes de
+    rowid, confirmando cada lote en su propia transaccion"""
+
+    def __init__(self, tabla, asignacion, pendiente, tamano_lote=None):
+        self.tabla = tabla
+        self.asignacion = asignacion
+        self.pendiente = pendiente
+        self.tamano_lote = tamano_lote or TAMANO_LOTE_MIGRACION
+
+    def aplicar(self, conexion):
+        """Rellena todas las filas pendientes. Regresa cuantas filas modifico"""
+        limite = f"""SELECT max(rowid) FROM (SELECT rowid FROM {self.tabla}
+                     WHERE rowid > ? AND ({self.pendiente}) ORDER BY rowid LIMIT ?)"""
+        actualizar = f"""UPDATE {self.tabla} SET {self.asignacion}
+                         WHERE rowid > ? AND rowid <= ? AND ({self.pendiente})"""
+        ultimo = 0
+        total = 0
+        while True:
+            with transaccion_escritura(conexion):
+                hasta = conexion.execute(limite, (ultimo, self.tamano_lote)).fetchone()[0]
+                if hasta is None:
+                    return total
+                total += conexion.execute(actualizar, (ultimo, hasta)).rowcount
+            ultimo = hasta
+            time.sleep(PAUSA_ENTRE_LOTES)
+
+
+def _sin_cambios(cursor):
+    pass
+
+
+def version_esquema(conexion):
+    """Funcion que regresa la version del esquema guardada en PRAGMA user_version"""
+    return conexion.execute("PRAGMA user_version").fetchone()[0]
+
+
+def columnas(cursor, tabla):
+    """Funcion que regresa {nombre: tipo} de las columnas de la tabla"""
+    cursor.execute(f"SELECT name, type FROM pragma_table_info('{tabla}')")
+    return dict(cursor.fetchall())
+
+
+def agregar_columna(tabla, columna, definicion):
+    """Funcion que crea un paso que agrega la columna si todavia no existe"""
+
+    def paso(cursor):
+        if columna not in columnas(cursor, tabla):
+            cursor.execute(f"ALTER TABLE {tabla} ADD COLUMN {columna} {definicion}")
+
+    return paso
+
+
+def crear_tablas(cursor):
+    """Funcion que crea las tablas y los turnos si no existen"""
+    cursor.execute(
+        """CREATE TABLE IF NOT EXISTS Clientes (id_cliente INTEGER PRIMARY KEY, nombre TEXT NOT NULL, apellido TEXT NOT NULL)"""
+    )
+    cursor.execute(
+        """CREATE TABLE IF NOT EXISTS Salas (id_sala INTEGER PRIMARY KEY, nombre TEXT NOT NULL, cupo INTEGER NOT NULL)"""
+    )
+    cursor.execute(
+        "CREATE TABLE IF NOT EXISTS Turnos (id_turno INTEGER PRIMARY KEY, turno TEXT NOT NULL)"
+    )
+    cursor.execute(
+        """CREATE TABLE IF NOT EXISTS Reservaciones (id_reservaciones INTEGER PRIMARY KEY, id_cliente INTEGER NOT NULL,
+         id_sala INTEGER NOT NULL, fecha INTEGER, id_turno INTEGER, evento TEXT NOT NULL, estatus TEXT NOT NULL DEFAULT 'Activa',
+           FOREIGN KEY(id_cliente) REFERENCES Clientes(id_cliente), FOREIGN KEY(id_sala) REFERENCES Salas(id_sala), FOREIGN KEY(id_turno) REFERENCES Turnos(id_turno))"""
+    )
+    cursor.execute("SELECT COUNT(*) FROM Turnos")
+    if cursor.fetchone()[0] == 0:
+        cursor.executemany(
+            "INSERT INTO Turnos (id_turno, turno) VALUES (?, ?)",
+            [(1, "Matutino"), (2, "Vespertino"), (3, "Nocturno")],
+        )
+
+
+def migrar_fechas_enteras(cursor):
+    """Funcion que convierte una tabla Reservaciones con fechas TEXT (AAAA-MM-DD) a
+    fechas INTEGER (numero de dia). SQLite no cambia el tipo de una columna y una
+    columna TEXT convierte los enteros a texto, asi que la tabla se copia a una
+    nueva en una sola sentencia. Los indices se crean en la migracion siguiente"""
+    if columnas(cursor, "Reservaciones").get("fecha", "").upper() != "TEXT":
+        return
+    cursor.execute(
+        """CREATE TABLE Reservaciones_nueva (id_reservaciones INTEGER PRIMARY KEY, id_cliente INTEGER NOT NULL,
+         id_sala INTEGER NOT NULL, fecha INTEGER, id_turno INTEGER, evento TEXT NOT NULL, estatus TEXT NOT NULL DEFAULT 'Activa',
+           FOREIGN KEY(id_cliente) REFERENCES Clientes(id_cliente), FOREIGN KEY(id_sala) REFERENCES Salas(id_sala), FOREIGN KEY(id_turno) REFERENCES Turnos(id_turno))"""
+    )
+    cursor.execute(
+        f"""INSERT INTO Reservaciones_nueva
+            SELECT id_reservaciones, id_cliente, id_sala,
+                   CAST(julianday(fecha) - {DIFERENCIA_JULIANA} AS INTEGER),
+                   id_turno, evento, estatus
+            FROM Reservaciones ORDER BY id_reservaciones"""
+    )
+    cursor.execute("DROP TABLE Reservaciones")
+    cursor.execute("ALTER TABLE Reservaciones_nueva RENAME TO Reservaciones")
+
+
+def cancelar_duplicadas(cursor):
+    """Funcion que deja activa solo la reservacion de menor clave de cada sala, fecha
+    y turno y cancela las demas, que quedaron de reservar dos veces el mismo espacio
+    antes del indice unico. Regresa un aviso con cuantas cancelo o None"""
+    cursor.execute(
+        """UPDATE Reservaciones SET estatus = 'Cancelada'
+           WHERE estatus = 'Activa' AND id_reservaciones NOT IN (
+                 SELECT min(id_reservaciones) FROM Reservaciones WHERE estatus = 'Activa'
+                 GROUP BY id_sala, fecha, id_turno)"""
+    )
+    if cursor.rowcount > 0:
+        return (
+            f"Se cancelaron {cursor.rowcount} reservaciones duplicadas (misma sala, "
+            "fecha y turno); se conservo la de menor clave."
+        )
+    return None
+
+
+def crear_indices(cursor):
+    """Funcion que crea los indices de las consultas frecuentes. Antes del indice
+    unico cancela las reservaciones duplicadas; regresa el aviso de cancelar_duplicadas"""
+    aviso = cancelar_duplicadas(cursor)
+    cursor.execute(
+        """CREATE UNIQUE INDEX IF NOT EXISTS idx_reservaciones_ocupacion
+           ON Reservaciones (id_sala, fecha, id_turno) WHERE estatus = 'Activa'"""
+    )
+    cursor.execute(
+        """CREATE INDEX IF NOT EXISTS idx_reservaciones_activas_fecha
+           ON Reservaciones (fecha, id_reservaciones, id_cliente, id_sala, id_turno, evento, estatus) WHERE estatus = 'Activa'"""
+    )
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_salas_cupo ON Salas (cupo, nombre)")
+    cursor.execute(
+        """CREATE INDEX IF NOT EXISTS idx_clientes_apellido_nombre
+           ON Clientes (apellido COLLATE NOCASE, nombre COLLATE NOCASE)"""
+    )
+    return aviso
+
+
+def tiene_busqueda_clientes(cursor):
+    """Funcion que indica si existe la tabla FTS5 de busqueda de clientes"""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'Clientes_fts'")
+    return cursor.fetchone() is not None
+
+
+def crear_busqueda_clientes(cursor):
+    """Funcion que crea la tabla FTS5 (tokenizador trigram) para buscar clientes por
+    cualquier parte del nombre, con triggers que la mantienen sincronizada.
+    Si SQLite no tiene FTS5 la busqueda usa LIKE y no se crea nada"""
+    if tiene_busqueda_clientes(cursor):
+        return
+    try:
+        cursor.execute(
+            """CREATE VIRTUAL TABLE Clientes_fts USING fts5(nombre, apellido,
+               content='Clientes', content_rowid='id_cliente', tokenize='trigram')"""
+        )
+    except OperationalError:
+        return
+    cursor.execute(
+        """CREATE TRIGGER IF NOT EXISTS clientes_fts_insertar AFTER INSERT ON Clientes BEGIN
+           INSERT INTO Clientes_fts(rowid, nombre, apellido) VALUES (new.id_cliente, new.nombre, new.apellido);
+           END"""
+    )
+    cursor.execute(
+        """CREATE TRIGGER IF NOT EXISTS clientes_fts_borrar AFTER DELETE ON Clientes BEGIN
+           INSERT INTO Clientes_fts(Clientes_fts, rowid, nombre, apellido) VALUES ('delete', old.id_cliente, old.nombre, old.apellido);
+           END"""
+    )
+    cursor.execute(
+        """CREATE TRIGGER IF NOT EXISTS clientes_fts_actualizar AFTER UPDATE ON Clientes BEGIN
+           INSERT INTO Clientes_fts(Clientes_fts, rowid, nombre, apellido) VALUES ('delete', old.id_cliente, old.nombre, old.apellido);
+           INSERT INTO Clientes_fts(rowid, nombre, apellido) VALUES (new.id_cliente, new.nombre, new.apellido);
+           END"""
+    )
+    cursor.execute("INSERT INTO Clientes_fts(Clientes_fts) VALUES ('rebuild')")
+
+
+def crear_archivo(cursor):
+    """Funcion que crea la tabla de reservaciones archivadas, el indice de las
+    reservaciones por archivar y la vista con el historial completo"""
+    cursor.execute(
+        """CREATE TABLE IF NOT EXISTS ReservacionesArchivo (id_reservaciones INTEGER PRIMARY KEY, id_cliente INTEGER NOT NULL,
+         id_sala INTEGER NOT NULL, fecha INTEGER, id_turno INTEGER, evento TEXT NOT NULL, estatus TEXT NOT NULL,
+         cancelada_en TEXT, archivada_en TEXT NOT NULL)"""
+    )
+    cursor.execute(
+        """CREATE INDEX IF NOT EXISTS idx_archivo_fecha
+           ON ReservacionesArchivo (fecha, id_reservaciones)"""
+    )
+    cursor.execute(
+        """CREATE INDEX IF NOT EXISTS idx_reservaciones_no_activas
+           ON Reservaciones (id_reservaciones) WHERE estatus <> 'Activa'"""
+    )
+    cursor.execute(
+        """CREATE VIEW IF NOT EXISTS HistorialReservaciones AS
+           SELECT id_reservaciones, id_cliente, id_sala, fecha, id_turno, evento, estatus,
+                  cancelada_en, NULL AS archivada_en
+           FROM Reservaciones
+           UNION ALL
+           SELECT id_reservaciones, id_cliente, id_sala, fecha, id_turno, evento, estatus,
+                  cancelada_en, archivada_en
+           FROM ReservacionesArchivo"""
+    )
+
+
+def crear_indice_historial(cursor):
+    """Funcion que crea el indice por fecha de las reservaciones no activas que
+    siguen en Reservaciones, para que el historial no recorra la tabla"""
+    cursor.execute(
+        """CREATE INDEX IF NOT EXISTS idx_reservaciones_no_activas_fecha
+           ON Reservaciones (fecha, id_reservaciones) WHERE estatus <> 'Activa'"""
+    )
+
+
+def crear_version_ocupacion(cursor):
+    """Funcion que crea el contador de cambios de las reservaciones activas que usa
+    el indice de ocupacion, con triggers que lo incrementan en la misma transaccion
+    cada vez que una reservacion activa se inserta, se borra o se modifica"""
+    cursor.execute("CREATE TABLE IF NOT EXISTS VersionOcupacion (version INTEGER NOT NULL)")
+    cursor.execute(
+        """INSERT INTO VersionOcupacion (version)
+           SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM VersionOcupacion)"""
+    )
+    cursor.execute(
+        """CREATE TRIGGER IF NOT EXISTS ocupacion_insertar AFTER INSERT ON Reservaciones
+           WHEN new.estatus = 'Activa' BEGIN
+           UPDATE VersionOcupacion SET version = version + 1;
+           END"""
+    )
+    cursor.execute(
+        """CREATE TRIGGER IF NOT EXISTS ocupacion_borrar AFTER DELETE ON Reservaciones
+           WHEN old.estatus = 'Activa' BEGIN
+           UPDATE VersionOcupacion SET version = version + 1;
+           END"""
+    )
+    cursor.execute(
+        """CREATE TRIGGER IF NOT EXISTS ocupacion_actualizar
+           AFTER UPDATE OF id_sala, fecha, id_turno, estatus ON Reservaciones
+           WHEN old.estatus = 'Activa' OR new.estatus = 'Activa' BEGIN
+           UPDATE VersionOcupacion SET version = version + 1;
+           END"""
+    )
+
+
+def crear_version_catalogos(cursor):
+    """Funcion que crea el contador de cambios de Salas y Turnos que usa el cache de
+    catalogos, con triggers que lo incrementan en la misma transaccion del cambio"""
+    cursor.execute("CREATE TABLE IF NOT EXISTS VersionCatalogos (version INTEGER NOT NULL)")
+    cursor.execute(
+        """INSERT INTO VersionCatalogos (version)
+           SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM VersionCatalogos)"""
+    )
+    for tabla in ("Salas", "Turnos"):
+        for evento in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(
+                f"""CREATE TRIGGER IF NOT EXISTS catalogos_{tabla.lower()}_{evento.lower()}
+                    AFTER {evento} ON {tabla} BEGIN
+                    UPDATE VersionCatalogos SET version = version + 1;
+                    END"""
+            )
+
+
+MIGRACIONES = [
+    Migracion(1, "Tablas y turnos", [crear_tablas]),
+    Migracion(2, "Fechas como numero de dia", [migrar_fechas_enteras]),
+    Migracion(3, "Indices de consultas frecuentes", [crear_indices]),
+    Migracion(4, "Busqueda de clientes con FTS5", [crear_busqueda_clientes]),
+    Migracion(
+        5,
+        "Archivo de reservaciones",
+        [agregar_columna("Reservaciones", "cancelada_en", "TEXT"), crear_archivo],
+    ),
+    Migracion(6, "Indice del historial", [crear_indice_historial]),
+    Migracion(7, "Version del indice de ocupacion", [crear_version_ocupacion]),
+    Migracion(8, "Version del cache de catalogos", [crear_version_catalogos]),
+]
+
+VERSION_ESQUEMA = MIGRACIONES[-1].version
+
+
+def migrar(conexion=None, avisos=None):
+    """Funcion que aplica las migraciones pendientes. Regresa las versiones aplicadas;
+    una base de datos al dia solo cuesta leer PRAGMA user_version. Los avisos de los
+    pasos (datos que se corrigieron) se agregan a la lista avisos si se indica"""
+    conexion = conexion or obtener_conexion()
+    version = version_esquema(conexion)
+    if version > VERSION_ESQUEMA:
+        raise ErrorMigracion(
+            f"La base de datos tiene la version {version} del esquema y este programa "
+            f"solo conoce hasta la {VERSION_ESQUEMA}."
+        )
+    aplicadas = []
+    for migracion in MIGRACIONES:
+        if migracion.version > version and migracion.aplicar(conexion, avisos):
+            aplicadas.append(migracion.version)
+    return aplicadas
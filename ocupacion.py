@@ -0,0 +1,168 @@
+import datetime
+import threading
+from contextlib import contextmanager
+
+from bd import a_dia, a_fecha, obtener_conexion, transaccion_escritura
+
+
+def version_ocupacion(conexion):
+    """Funcion que regresa el contador de cambios de las reservaciones activas.
+    Lo mantienen los triggers de Reservaciones, asi que tiene el mismo valor en
+    todas las conexiones y procesos que ven la misma transaccion confirmada"""
+    return conexion.execute("SELECT version FROM VersionOcupacion").fetchone()[0]
+
+
+class IndiceOcupacion:
+    """Indice en memoria de las reservaciones activas por sala, dia y turno.
+    Cada sala tiene un bytearray con un byte por (dia, turno) a partir del primer
+    dia conocido, de modo que saber si un espacio esta ocupado es un acceso directo.
+    Se carga una vez desde Reservaciones y guarda el valor de VersionOcupacion que
+    refleja. Las escrituras de este proceso lo actualizan en su lugar y avanzan esa
+    version; si una conexion ve otra version, alguien mas escribio y se recarga"""
+
+    def __init__(self):
+        self._candado = threading.RLock()
+        self._cargado = False
+        self._salas = {}
+        self._columnas = {}
+        self._base = 0
+        self._version = None
+
+    def cargar(self, conexion):
+        """Lee las reservaciones activas y reconstruye el indice. La version se lee
+        primero y todo dentro de una misma transaccion de lectura, asi que una
+        escritura confirmada durante la carga provoca otra recarga en vez de perderse"""
+        with self._candado:
+            propia = not conexion.in_transaction
+            if propia:
+                conexion.execute("BEGIN")
+            try:
+                cursor = conexion.cursor()
+                version = version_ocupacion(conexion)
+                cursor.execute("SELECT id_turno FROM Turnos ORDER BY id_turno")
+                self._columnas = {
+                    fila[0]: columna for columna, fila in enumerate(cursor.fetchall())
+                }
+                cursor.execute(
+                    "SELECT min(fecha) FROM Reservaciones WHERE estatus = 'Activa'"
+                )
+                minimo = cursor.fetchone()[0]
+                self._base = minimo if minimo else datetime.date.today().toordinal()
+                self._salas = {}
+                cursor.execute(
+                    "SELECT id_sala, fecha, id_turno FROM Reservaciones WHERE estatus = 'Activa'"
+                )
+                for id_sala, dia, id_turno in cursor:
+                    self._marcar(id_sala, dia, id_turno, 1)
+            finally:
+                if propia:
+                    conexion.commit()
+            self._version = version
+            self._cargado = True
+
+    def sincronizar(self, conexion):
+        """Recarga el indice si no se ha cargado o si la conexion ve una version
+        distinta a la que refleja"""
+        with self._candado:
+            if not self._cargado or version_ocupacion(conexion) != self._version:
+                self.cargar(conexion)
+
+    def aplicar(self, inicio, fin, cambios):
+        """Aplica los cambios (id_sala, dia, id_turno, valor) de una transaccion
+        confirmada que llevo la version de inicio a fin. Si el indice no estaba en
+        la version de inicio, otra conexion escribio antes y se recarga en el
+        siguiente acceso, salvo que ya se haya recargado con estos cambios"""
+        with self._candado:
+            if not self._cargado:
+                return
+            if self._version == inicio:
+                for id_sala, dia, id_turno, valor in cambios:
+                    self._marcar(id_sala, dia, id_turno, valor)
+                self._version = fin
+            elif self._version < fin:
+                self._cargado = False
+
+    def invalidar(self):
+        """Obliga a recargar el indice en el siguiente acceso"""
+        with self._candado:
+            self._cargado = False
+
+    def _marcar(self, id_sala, dia, id_turno, valor):
+        columna = self._columnas.get(id_turno)
+        if columna is None:
+            # Turno nuevo o desconocido: se reconstruye en el siguiente acceso
+            self._cargado = False
+            return
+        turnos = len(self._columnas)
+        if dia < self._base:
+            recorrido = bytes((self._base - dia) * turnos)
+            for arreglo in self._salas.values():
+                arreglo[0:0] = recorrido
+            self._base = dia
+        arreglo = self._salas.setdefault(id_sala, bytearray())
+        posicion = (dia - self._base) * turnos + columna
+        if posicion >= len(arreglo):
+            if not valor:
+                return
+            arreglo.extend(bytes(posicion + 1 - len(arreglo)))
+        arreglo[posicion] = valor
+
+    def ocupado(self, id_sala, fecha, id_turno):
+        """Regresa True si la sala tiene una reservacion activa en la fecha y turno"""
+        with self._candado:
+            return self._ocupado(id_sala, a_dia(fecha), id_turno)
+
+    def _ocupado(self, id_sala, dia, id_turno):
+        arreglo = self._salas.get(id_sala)
+        columna = self._columnas.get(id_turno)
+        if arreglo is None or columna is None or dia < self._base:
+            return False
+        posicion = (dia - self._base) * len(self._columnas) + columna
+        return posicion < len(arreglo) and arreglo[posicion] == 1
+
+    def libres(self, id_sala, fecha_inicio, fecha_fin, id_turnos=None):
+        """Regresa la lista de (fecha, id_turno) libres de la sala entre las dos fechas"""
+        with self._candado:
+            if id_turnos is None:
+                id_turnos = list(self._columnas)
+            espacios = []
+            for dia in range(a_dia(fecha_inicio), a_dia(fecha_fin) + 1):
+                for id_turno in id_turnos:
+                    if id_turno in self._columnas and not self._ocupado(
+                        id_sala, dia, id_turno
+                    ):
+                        espacios.append((a_fecha(dia), id_turno))
+            return espacios
+
+
+_indice = IndiceOcupacion()
+
+
+def obtener_indice(conexion=None):
+    """Funcion que regresa el indice de ocupacion al dia con la conexion indicada
+    (por omision la del hilo actual)"""
+    _indice.sincronizar(conexion or obtener_conexion())
+    return _indice
+
+
+@contextmanager
+def transaccion_ocupacion(conexion=None):
+    """Abre una transaccion de escritura que cambia reservaciones activas. Regresa
+    la conexion y una lista donde se anotan los cambios (id_sala, dia, id_turno,
+    valor) para el indice; al confirmarse se aplican junto con la version que dejo
+    la transaccion, de modo que ninguna conexion necesita recargar el indice"""
+    cambios = []
+    confirmando = False
+    try:
+        with transaccion_escritura(conexion) as conexion:
+            inicio = version_ocupacion(conexion)
+            yield conexion, cambios
+            fin = version_ocupacion(conexion)
+            # El indice se bloquea desde antes de confirmar para que ningun lector
+            # vea la version nueva sin los cambios y recargue de mas
+            _indice._candado.acquire()
+            confirmando = True
+        _indice.aplicar(inicio, fin, cambios)
+    finally:
+        if confirmando:
+            _indice._candado.release()
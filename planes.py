@@ -0,0 +1,50 @@
+"""Revision de los planes de las consultas de produccion.
+
+Aplica las migraciones a una base de datos y revisa con EXPLAIN QUERY PLAN que
+ninguna consulta de servicios.CONSULTAS_PRODUCCION recorra una tabla completa,
+ni siquiera por un indice cubriente, y que la exportacion completa no ordene en
+una tabla temporal. Termina con codigo 1 si alguna consulta no pasa la revision.
+
+    python -m planes --bd coworking.db
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import bd
+import servicios
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bd", help="Ruta de la base de datos (por omision una temporal)")
+    argumentos = parser.parse_args(argv)
+
+    temporal = None
+    ruta = argumentos.bd
+    if ruta is None:
+        temporal = tempfile.TemporaryDirectory()
+        ruta = os.path.join(temporal.name, "planes.db")
+    try:
+        bd.configurar_bd(ruta)
+        servicios.crear_esquema()
+        con_recorrido = servicios.verificar_planes_consulta()
+    finally:
+        bd.cerrar_conexiones()
+        if temporal is not None:
+            temporal.cleanup()
+
+    for nombre, plan in con_recorrido.items():
+        print(f"{nombre}: {json.dumps(plan, ensure_ascii=False)}")
+    print(
+        f"{len(servicios.CONSULTAS_PRODUCCION) - len(con_recorrido)} de "
+        f"{len(servicios.CONSULTAS_PRODUCCION)} consultas usan indices"
+    )
+    return 1 if con_recorrido else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
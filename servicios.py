@@ -0,0 +1,768 @@
+import csv
+import datetime
+import json
+import os
+from sqlite3 import IntegrityError
+
+from archivo import CONSULTA_POR_ARCHIVAR, INSERTAR_ARCHIVO, TAMANO_LOTE_ARCHIVO
+from bd import a_dia, obtener_conexion, transaccion_escritura
+from catalogo import catalogo
+from exportacion import (
+    CONSULTA_ANCHOS_EXCEL,
+    CONSULTA_EXPORTAR,
+    ORIGEN_ACTIVAS_Y_COMPLETADAS,
+    TAMANO_LOTE,
+    construir_consulta_exportar,
+)
+from instrumentacion import instrumentar
+from migraciones import migrar, tiene_busqueda_clientes
+from ocupacion import obtener_indice, transaccion_ocupacion
+
+
+class ErrorServicio(Exception):
+    """Error de una operacion del servicio por datos no validos o reglas de negocio"""
+
+
+CONSULTA_RESERVACIONES = """SELECT r.id_reservaciones, c.nombre || ' ' || c.apellido AS cliente, r.id_sala, r.fecha, t.turno, r.evento, r.id_turno
+       FROM {origen} r
+       JOIN Clientes c ON r.id_cliente = c.id_cliente
+       JOIN Turnos t ON r.id_turno = t.id_turno
+       WHERE {condicion}"""
+
+CONSULTA_RESERVACIONES_ACTIVAS = CONSULTA_RESERVACIONES.format(
+    origen="Reservaciones", condicion="r.estatus = 'Activa'"
+)
+
+# Incluye las reservaciones completadas que ya estan en el archivo; solo para
+# consultar, porque esas ya no se pueden editar ni cancelar
+CONSULTA_RESERVACIONES_Y_COMPLETADAS = CONSULTA_RESERVACIONES.format(
+    origen=ORIGEN_ACTIVAS_Y_COMPLETADAS, condicion="r.fecha BETWEEN ? AND ?"
+)
+
+CONSULTA_RESERVACIONES_RANGO = (
+    CONSULTA_RESERVACIONES_ACTIVAS + "\n       AND r.fecha BETWEEN ? AND ?"
+)
+
+SIGUIENTE = """
+       AND (r.fecha, r.id_reservaciones) > (?, ?)
+       ORDER BY r.fecha, r.id_reservaciones LIMIT ?"""
+
+ANTERIOR = """
+       AND (r.fecha, r.id_reservaciones) < (?, ?)
+       ORDER BY r.fecha DESC, r.id_reservaciones DESC LIMIT ?"""
+
+EN_RANGO = "\n       AND r.id_reservaciones = ?"
+
+CONSULTA_PAGINA_SIGUIENTE = CONSULTA_RESERVACIONES_RANGO + SIGUIENTE
+
+CONSULTA_PAGINA_ANTERIOR = CONSULTA_RESERVACIONES_RANGO + ANTERIOR
+
+CONSULTA_RESERVACION_EN_RANGO = CONSULTA_RESERVACIONES_RANGO + EN_RANGO
+
+CONSULTAS_PAGINA = {
+    False: (CONSULTA_PAGINA_SIGUIENTE, CONSULTA_PAGINA_ANTERIOR, CONSULTA_RESERVACION_EN_RANGO),
+    True: (
+        CONSULTA_RESERVACIONES_Y_COMPLETADAS + SIGUIENTE,
+        CONSULTA_RESERVACIONES_Y_COMPLETADAS + ANTERIOR,
+        CONSULTA_RESERVACIONES_Y_COMPLETADAS + EN_RANGO,
+    ),
+}
+
+CONSULTA_RESERVACION_POR_ID = (
+    CONSULTA_RESERVACIONES_ACTIVAS + "\n       AND r.id_reservaciones = ?"
+)
+
+# Misma informacion que la vista HistorialReservaciones, pero separando las activas
+# de las demas para que cada parte use su indice parcial por fecha y SQLite una las
+# tres partes en orden (MERGE UNION ALL) sin recorrer ni ordenar la tabla
+COLUMNAS_HISTORIAL = (
+    "id_reservaciones, id_cliente, id_sala, fecha, id_turno, evento, estatus, cancelada_en"
+)
+
+CONSULTA_HISTORIAL = f"""SELECT h.id_reservaciones, c.nombre || ' ' || c.apellido AS cliente, h.id_sala, h.fecha, t.turno, h.evento, h.estatus, h.cancelada_en
+       FROM (SELECT {COLUMNAS_HISTORIAL} FROM Reservaciones WHERE estatus = 'Activa'
+             UNION ALL
+             SELECT {COLUMNAS_HISTORIAL} FROM Reservaciones WHERE estatus <> 'Activa'
+             UNION ALL
+             SELECT {COLUMNAS_HISTORIAL} FROM ReservacionesArchivo) h
+       JOIN Clientes c ON h.id_cliente = c.id_cliente
+       LEFT JOIN Turnos t ON h.id_turno = t.id_turno
+       WHERE h.fecha BETWEEN ? AND ?"""
+
+HISTORIAL_CLIENTE = "\n       AND h.id_cliente = ?"
+
+ORDEN_HISTORIAL = "\n       ORDER BY h.fecha, h.id_reservaciones"
+
+TAMANO_PAGINA = 20
+
+
+DIAS_ANTICIPACION = 2
+
+# Por omision los lotes (CLI, servidor e importacion) mueven al lunes las
+# reservaciones en domingo; la reservacion individual siempre las rechaza
+RECORRER_DOMINGOS = True
+
+CONSULTA_VALIDAR_LOTE = """SELECT l.numero,
+              CASE WHEN c.id_cliente IS NULL THEN 'Cliente no encontrado.'
+                   WHEN s.id_sala IS NULL THEN 'Sala no encontrada.'
+                   WHEN t.id_turno IS NULL THEN 'Turno no encontrado.'
+                   ELSE 'La sala ya esta reservada en esta fecha y turno.' END
+       FROM temp.lote_reservaciones l
+       LEFT JOIN Clientes c ON l.id_cliente = c.id_cliente
+       LEFT JOIN Salas s ON l.id_sala = s.id_sala
+       LEFT JOIN Turnos t ON l.id_turno = t.id_turno
+       WHERE c.id_cliente IS NULL OR s.id_sala IS NULL OR t.id_turno IS NULL
+          OR EXISTS (SELECT 1 FROM Reservaciones r
+                     WHERE r.id_sala = l.id_sala AND r.fecha = l.fecha
+                     AND r.id_turno = l.id_turno AND r.estatus = 'Activa')"""
+
+CONSULTA_SALAS_CUPO = "SELECT id_sala, nombre, cupo FROM Salas WHERE cupo >= ? ORDER BY cupo"
+
+LIMITE_BUSQUEDA = 20
+
+CONSULTA_CLIENTES_PREFIJO = """SELECT id_cliente, nombre, apellido FROM Clientes
+       WHERE apellido LIKE ?
+       ORDER BY apellido COLLATE NOCASE, nombre COLLATE NOCASE LIMIT ?"""
+
+# Parametros realistas para revisar los planes: los de un rango de un mes, una
+# pagina y un prefijo de apellido como los que usan el menu, la CLI y el servidor
+DIA_MUESTRA = datetime.date(2024, 6, 3).toordinal()
+
+CONSULTAS_PRODUCCION = {
+    "pagina_siguiente": (
+        CONSULTA_PAGINA_SIGUIENTE,
+        (DIA_MUESTRA, DIA_MUESTRA + 30, DIA_MUESTRA, 0, TAMANO_PAGINA),
+    ),
+    "pagina_anterior": (
+        CONSULTA_PAGINA_ANTERIOR,
+        (DIA_MUESTRA, DIA_MUESTRA + 30, DIA_MUESTRA + 30, 1000, TAMANO_PAGINA),
+    ),
+    "reservacion_en_rango": (
+        CONSULTA_RESERVACION_EN_RANGO,
+        (DIA_MUESTRA, DIA_MUESTRA + 30, 1),
+    ),
+    "reservacion_por_id": (CONSULTA_RESERVACION_POR_ID, (1,)),
+    "exportar": (CONSULTA_EXPORTAR, ()),
+    "exportar_filtrado": construir_consulta_exportar(
+        {"fecha_inicio": DIA_MUESTRA, "fecha_fin": DIA_MUESTRA + 30, "id_sala": 1}
+    ),
+    "anchos_excel": (CONSULTA_ANCHOS_EXCEL.format(consulta=CONSULTA_EXPORTAR), ()),
+    "salas_cupo": (CONSULTA_SALAS_CUPO, (10,)),
+    "clientes_prefijo": (CONSULTA_CLIENTES_PREFIJO, ("Lop%", LIMITE_BUSQUEDA)),
+    "historial": (CONSULTA_HISTORIAL + ORDEN_HISTORIAL, (DIA_MUESTRA - 365, DIA_MUESTRA)),
+    "historial_cliente": (
+        CONSULTA_HISTORIAL + HISTORIAL_CLIENTE + ORDEN_HISTORIAL,
+        (DIA_MUESTRA - 365, DIA_MUESTRA, 1),
+    ),
+    "por_archivar": (CONSULTA_POR_ARCHIVAR, (DIA_MUESTRA, TAMANO_LOTE_ARCHIVO)),
+    "insertar_archivo": (INSERTAR_ARCHIVO, ("2024-06-03T00:00:00", 1)),
+}
+
+# Consultas que leen todas las reservaciones a proposito (exportar sin filtros);
+# pueden recorrer un indice pero deben hacerlo en orden, sin ordenar en temporal
+CONSULTAS_RECORRIDO_COMPLETO = {"exportar", "anchos_excel"}
+
+
+def recorre_tabla(paso):
+    """Funcion que indica si un paso de EXPLAIN QUERY PLAN recorre una tabla completa,
+    ya sea la tabla o uno de sus indices (tambien los cubrientes)"""
+    return paso.startswith("SCAN ") and not paso.startswith(
+        ("SCAN (subquery", "SCAN CONSTANT ROW")
+    )
+
+
+@instrumentar()
+def crear_esquema(avisos=None):
+    """Funcion que crea la base de datos o aplica las migraciones pendientes del esquema.
+    Los avisos de las migraciones se agregan a la lista avisos si se indica"""
+    return migrar(avisos=avisos)
+
+
+def verificar_planes_consulta():
+    """Funcion que revisa con EXPLAIN QUERY PLAN que las consultas de produccion usen indices.
+    Regresa un diccionario con las consultas que recorren una tabla completa (o que
+    ordenan en temporal las que deben recorrerla) y su plan"""
+    con_recorrido = {}
+    with obtener_conexion() as conexion:
+        cursor = conexion.cursor()
+        for nombre, (consulta, parametros) in CONSULTAS_PRODUCCION.items():
+            cursor.execute(f"EXPLAIN QUERY PLAN {consulta}", parametros)
+            plan = [fila[3] for fila in cursor.fetchall()]
+            if nombre in CONSULTAS_RECORRIDO_COMPLETO:
+                problema = any(paso.startswith("USE TEMP B-TREE") for paso in plan)
+            else:
+                problema = any(recorre_tabla(paso) for paso in plan)
+            if problema:
+                con_recorrido[nombre] = plan
+    return con_recorrido
+
+
+def nombre_valido(texto):
+    """Funcion que valida que un nombre o apellido contenga solo letras y espacios"""
+    return texto.replace(" ", "").isalpha()
+
+
+def cupo_valido(texto):
+    """Funcion que valida que el cupo de una sala sea numerico"""
+    return texto.isdigit()
+
+
+@instrumentar()
+def insertar_reservacion(id_cliente, id_sala, fecha, id_turno, evento):
+    """Funcion que inserta una reservacion activa apoyandose en el indice unico.
+    fecha es un datetime.date, texto AAAA-MM-DD o numero de dia.
+    Regresa el id de la reservacion o None si la sala ya esta ocupada"""
+    dia = a_dia(fecha)
+    with transaccion_ocupacion() as (conexion, cambios):
+        cursor = conexion.cursor()
+        try:
+            cursor.execute(
+                """INSERT INTO Reservaciones (id_cliente, id_sala, fecha, id_turno, evento, estatus)
+                   VALUES (?, ?, ?, ?, ?, 'Activa')""",
+                (id_cliente, id_sala, dia, id_turno, evento),
+            )
+        except IntegrityError as e:
+            if "UNIQUE" not in str(e):
+                raise
+            return None
+        cambios.append((id_sala, dia, id_turno, 1))
+        return cursor.lastrowid
+
+
+@instrumentar()
+def buscar_clientes(texto, limite=LIMITE_BUSQUEDA):
+    """Funcion que busca hasta 'limite' clientes cuyo apellido empiece con el texto
+    (usando el indice por apellido y nombre) y completa con los que lo contengan en
+    el nombre o apellido (con la tabla FTS5 si existe). Regresa (id, nombre, apellido)"""
+    if limite < 1:
+        raise ErrorServicio("El limite de la busqueda debe ser mayor a cero.")
+    texto = texto.strip()
+    if texto and not nombre_valido(texto):
+        return []
+    with obtener_conexion() as conexion:
+        cursor = conexion.cursor()
+        cursor.execute(CONSULTA_CLIENTES_PREFIJO, (texto + "%", limite))
+        clientes = cursor.fetchall()
+        if not texto or len(clientes) >= limite:
+            return clientes
+
+        encontrados = {cliente[0] for cliente in clientes}
+        faltantes = limite - len(clientes)
+        if len(texto) >= 3 and tiene_busqueda_clientes(cursor):
+            cursor.execute(
+                """SELECT rowid, nombre, apellido FROM Clientes_fts
+                   WHERE Clientes_fts MATCH ? ORDER BY rank LIMIT ?""",
+                ('"' + texto + '"', limite),
+            )
+        else:
+            cursor.execute(
+                """SELECT id_cliente, nombre, apellido FROM Clientes
+                   WHERE nombre LIKE ? OR apellido LIKE ? LIMIT ?""",
+                ("%" + texto + "%", "%" + texto + "%", limite),
+            )
+        for cliente in cursor.fetchall():
+            if faltantes == 0:
+                break
+            if cliente[0] not in encontrados:
+                clientes.append(cliente)
+                faltantes -= 1
+    return clientes
+
+
+def obtener_cliente(id_cliente):
+    """Funcion que busca un cliente por su clave. Regresa (id, nombre, apellido) o None"""
+    with obtener_conexion() as conexion:
+        cursor = conexion.cursor()
+        cursor.execute(
+            "SELECT id_cliente, nombre, apellido FROM Clientes WHERE id_cliente = ?",
+            (id_cliente,),
+        )
+        return cursor.fetchone()
+
+
+@instrumentar()
+def registrar_cliente(nombre, apellido):
+    """Funcion que registra un cliente. Regresa su clave o lanza ErrorServicio"""
+    resultado = validar_cliente({"nombre": nombre, "apellido": apellido})
+    if isinstance(resultado, str):
+        raise ErrorServicio(resultado)
+    with transaccion_escritura() as conexion:
+        cursor = conexion.cursor()
+        cursor.execute("INSERT INTO Clientes (nombre, apellido) VALUES(?,?)", resultado)
+        return cursor.lastrowid
+
+
+@instrumentar()
+def registrar_sala(nombre, cupo):
+    """Funcion que registra una sala. Regresa su clave o lanza ErrorServicio"""
+    resultado = validar_sala({"nombre": nombre, "cupo": cupo})
+    if isinstance(resultado, str):
+        raise ErrorServicio(resultado)
+    with transaccion_escritura() as conexion:
+        cursor = conexion.cursor()
+        cursor.execute("INSERT INTO Salas (nombre, cupo) VALUES(?,?)", resultado)
+    catalogo.invalidar()
+    return cursor.lastrowid
+
+
+@instrumentar()
+def reservar(id_cliente, id_sala, fecha, id_turno, evento, hoy=None):
+    """Funcion que registra una reservacion con las mismas reglas que el menu.
+    fecha es un datetime.date o texto MM-DD-AAAA o AAAA-MM-DD y no puede ser domingo.
+    Regresa la clave de la reservacion o lanza ErrorServicio"""
+    if hoy is None:
+        hoy = datetime.date.today()
+    if isinstance(fecha, datetime.date):
+        fecha = fecha.isoformat()
+    resultado = validar_reservacion(
+        (id_cliente, id_sala, fecha, id_turno, evento), hoy, recorrer_domingos=False
+    )
+    if isinstance(resultado, str):
+        raise ErrorServicio(resultado)
+    id_cliente, id_sala, dia, id_turno, evento = resultado
+    if obtener_cliente(id_cliente) is None:
+        raise ErrorServicio("Cliente no encontrado.")
+    if id_sala not in catalogo.salas():
+        raise ErrorServicio("Sala no encontrada.")
+    if id_turno not in catalogo.turnos():
+        raise ErrorServicio("Turno no encontrado.")
+    id_reservacion = None
+    if not obtener_indice().ocupado(id_sala, dia, id_turno):
+        id_reservacion = insertar_reservacion(id_cliente, id_sala, dia, id_turno, evento)
+    if id_reservacion is None:
+        raise ErrorServicio("La sala ya esta reservada en esta fecha y turno.")
+    return id_reservacion
+
+
+@instrumentar()
+def obtener_reservacion(id_reservacion):
+    """Funcion que busca una reservacion activa por su clave. Regresa
+    (id, cliente, id_sala, fecha, turno, evento, id_turno) o None"""
+    with obtener_conexion() as conexion:
+        cursor = conexion.cursor()
+        cursor.execute(CONSULTA_RESERVACION_POR_ID, (id_reservacion,))
+        return cursor.fetchone()
+
+
+@instrumentar()
+def editar_evento(id_reservacion, evento):
+    """Funcion que cambia el nombre del evento de una reservacion activa"""
+    evento = str(evento or "").strip()
+    if not nombre_valido(evento):
+        raise ErrorServicio("El nombre del evento solo puede contener letras.")
+    with transaccion_escritura() as conexion:
+        cursor = conexion.cursor()
+        cursor.execute(
+            "UPDATE Reservaciones SET evento=? WHERE id_reservaciones=? AND estatus = 'Activa'",
+            (evento, id_reservacion),
+        )
+        if cursor.rowcount == 0:
+            raise ErrorServicio("Reservacion no encontrada.")
+
+
+@instrumentar()
+def cancelar_lote(ids_reservacion, hoy=None):
+    """Funcion que cancela varias reservaciones activas en una sola transaccion.
+    Solo se cancelan las que faltan al menos DIAS_ANTICIPACION dias.
+    Regresa el numero de reservaciones canceladas y la lista de rechazos (fila, motivo)"""
+    if hoy is None:
+        hoy = datetime.date.today()
+    dia_hoy = hoy.toordinal()
+    cancelada_en = datetime.datetime.now().isoformat(timespec="seconds")
+    canceladas = []
+    rechazos = []
+    vistas = set()
+    with transaccion_ocupacion() as (conexion, cambios):
+        cursor = conexion.cursor()
+        for numero, id_reservacion in enumerate(ids_reservacion, start=1):
+            try:
+                id_reservacion = int(id_reservacion)
+            except (TypeError, ValueError):
+                rechazos.append((numero, "La clave de la reservacion debe ser un numero."))
+                continue
+            if id_reservacion in vistas:
+                rechazos.append((numero, "La reservacion ya se cancelo en este lote."))
+                continue
+            vistas.add(id_reservacion)
+            cursor.execute(CONSULTA_RESERVACION_POR_ID, (id_reservacion,))
+            reservacion = cursor.fetchone()
+            if reservacion is None:
+                rechazos.append((numero, "Reservacion no encontrada."))
+            elif reservacion[3] - dia_hoy < DIAS_ANTICIPACION:
+                rechazos.append(
+                    (
+                        numero,
+                        "La reservacion no puede cancelarse con menos de 2 dias de anticipacion.",
+                    )
+                )
+            else:
+                canceladas.append(reservacion)
+        cursor.executemany(
+            "UPDATE Reservaciones SET estatus = 'Cancelada', cancelada_en = ? WHERE id_reservaciones = ?",
+            [(cancelada_en, reservacion[0]) for reservacion in canceladas],
+        )
+        for _, _, id_sala, fecha, _, _, id_turno in canceladas:
+            cambios.append((id_sala, fecha, id_turno, 0))
+    return len(canceladas), rechazos
+
+
+def cancelar(id_reservacion, hoy=None):
+    """Funcion que cancela una reservacion activa o lanza ErrorServicio"""
+    _, rechazos = cancelar_lote([id_reservacion], hoy)
+    if rechazos:
+        raise ErrorServicio(rechazos[0][1])
+
+
+class PaginadorReservaciones:
+    """Listado de las reservaciones activas de un rango de fechas que se lee de una
+    pagina a la vez con paginacion por llave (fecha, id_reservaciones), de modo que
+    abrir un rango grande solo trae la primera pagina. Las fechas del rango pueden ser
+    datetime.date, texto AAAA-MM-DD o numero de dia; en las filas la fecha es el
+    numero de dia (ver bd.a_fecha). completadas=True incluye las reservaciones
+    completadas que ya se archivaron (para consultar, no para editar o cancelar)"""
+
+    def __init__(
+        self, fecha_inicio, fecha_fin, tamano_pagina=TAMANO_PAGINA, completadas=False
+    ):
+        self.dia_inicio = a_dia(fecha_inicio)
+        self.dia_fin = a_dia(fecha_fin)
+        self._siguiente, self._anterior, self._en_rango = CONSULTAS_PAGINA[completadas]
+        self.tamano_pagina = tamano_pagina
+        self.pagina = []
+        self.numero = 0
+        self.hay_siguiente = False
+
+    def _leer(self, consulta, desde, hasta, llave):
+        # El rango de fechas se acota con la fecha de la llave para que el indice
+        # empiece a leer justo en la llave y no desde el inicio del rango.
+        with obtener_conexion() as conexion:
+            cursor = conexion.cursor()
+            cursor.execute(consulta, (desde, hasta, *llave, self.tamano_pagina + 1))
+            return cursor.fetchall()
+
+    @instrumentar("paginador.siguiente")
+    def siguiente(self):
+        """Avanza a la siguiente pagina. Regresa False si no hay mas reservaciones"""
+        if self.pagina:
+            if not self.hay_siguiente:
+                return False
+            llave = (self.pagina[-1][3], self.pagina[-1][0])
+        else:
+            llave = (self.dia_inicio, 0)
+        filas = self._leer(self._siguiente, llave[0], self.dia_fin, llave)
+        if not filas:
+            return False
+        self.hay_siguiente = len(filas) > self.tamano_pagina
+        self.pagina = filas[: self.tamano_pagina]
+        self.numero += 1
+        return True
+
+    @instrumentar("paginador.anterior")
+    def anterior(self):
+        """Regresa a la pagina anterior. Regresa False si ya esta en la primera"""
+        if self.numero <= 1:
+            return False
+        llave = (self.pagina[0][3], self.pagina[0][0])
+        filas = self._leer(self._anterior, self.dia_inicio, llave[0], llave)
+        self.pagina = filas[: self.tamano_pagina][::-1]
+        self.hay_siguiente = True
+        self.numero -= 1
+        return True
+
+    @instrumentar("paginador.buscar")
+    def buscar(self, id_reservacion):
+        """Busca por clave una reservacion activa del rango, aunque no este en la pagina actual"""
+        with obtener_conexion() as conexion:
+            cursor = conexion.cursor()
+            cursor.execute(
+                self._en_rango,
+                (self.dia_inicio, self.dia_fin, id_reservacion),
+            )
+            return cursor.fetchone()
+
+    def reservaciones(self):
+        """Recorre todas las reservaciones del rango pagina por pagina"""
+        while self.siguiente():
+            yield from self.pagina
+
+
+def listar_reservaciones(
+    fecha_inicio, fecha_fin, tamano_pagina=TAMANO_LOTE, completadas=False
+):
+    """Funcion que recorre las reservaciones activas del rango en orden de fecha
+    leyendo tamano_pagina filas a la vez (completadas como en PaginadorReservaciones)"""
+    return PaginadorReservaciones(
+        fecha_inicio, fecha_fin, tamano_pagina, completadas
+    ).reservaciones()
+
+
+@instrumentar()
+def pagina_reservaciones(
+    fecha_inicio, fecha_fin, despues=None, tamano_pagina=TAMANO_PAGINA, completadas=False
+):
+    """Funcion que regresa una pagina de reservaciones activas del rango que empieza
+    despues de la llave (fecha, id_reservaciones) indicada, y si hay mas paginas
+    (completadas como en PaginadorReservaciones)"""
+    if tamano_pagina < 1:
+        raise ErrorServicio("El tamano de pagina debe ser mayor a cero.")
+    llave = (a_dia(despues[0]), despues[1]) if despues else (a_dia(fecha_inicio), 0)
+    with obtener_conexion() as conexion:
+        cursor = conexion.cursor()
+        cursor.execute(
+            CONSULTAS_PAGINA[completadas][0],
+            (llave[0], a_dia(fecha_fin), *llave, tamano_pagina + 1),
+        )
+        filas = cursor.fetchall()
+    return filas[:tamano_pagina], len(filas) > tamano_pagina
+
+
+def historial_reservaciones(fecha_inicio, fecha_fin, id_cliente=None):
+    """Funcion que recorre todas las reservaciones del rango, activas, canceladas y
+    archivadas, en orden de fecha. Regresa filas
+    (id, cliente, id_sala, fecha, turno, evento, estatus, cancelada_en)"""
+    consulta = CONSULTA_HISTORIAL
+    parametros = [a_dia(fecha_inicio), a_dia(fecha_fin)]
+    if id_cliente is not None:
+        consulta += HISTORIAL_CLIENTE
+        parametros.append(id_cliente)
+    with obtener_conexion() as conexion:
+        cursor = conexion.cursor()
+        cursor.execute(consulta + ORDEN_HISTORIAL, parametros)
+        while True:
+            lote = cursor.fetchmany(TAMANO_LOTE)
+            if not lote:
+                break
+            yield from lote
+
+
+@instrumentar()
+def buscar_salas_libres(fecha_inicio, fecha_fin, id_turno, cupo_minimo, hoy=None):
+    """Funcion que busca las salas con cupo suficiente que estan libres en el turno
+    indicado en alguna fecha reservable del rango (sin domingos y con la anticipacion
+    minima). Usa el indice de cupo y el indice de ocupacion en memoria.
+    Regresa una lista de (id_sala, nombre, cupo, fechas_libres) ordenada por el cupo
+    mas ajustado y luego por la fecha libre mas cercana"""
+    if hoy is None:
+        hoy = datetime.date.today()
+    primera_reservable = hoy + datetime.timedelta(days=DIAS_ANTICIPACION)
+    fecha_inicio = max(fecha_inicio, primera_reservable)
+    if fecha_fin < fecha_inicio:
+        return []
+
+    with obtener_conexion() as conexion:
+        cursor = conexion.cursor()
+        cursor.execute(CONSULTA_SALAS_CUPO, (cupo_minimo,))
+        salas = cursor.fetchall()
+    indice = obtener_indice(conexion)
+
+    resultados = []
+    for id_sala, nombre, cupo in salas:
+        fechas_libres = [
+            fecha
+            for fecha, _ in indice.libres(id_sala, fecha_inicio, fecha_fin, [id_turno])
+            if fecha.weekday() != 6
+        ]
+        if fechas_libres:
+            resultados.append((id_sala, nombre, cupo, fechas_libres))
+    resultados.sort(key=lambda sala: (sala[2] - cupo_minimo, sala[3][0], sala[0]))
+    return resultados
+
+
+def leer_registros(ruta):
+    """Funcion que lee un archivo CSV (con encabezados), JSON (arreglo de objetos)
+    o JSON Lines y regresa los registros uno por uno como diccionarios"""
+    extension = os.path.splitext(ruta)[1].lower()
+    with open(ruta, encoding="utf-8", newline="") as archivo:
+        if extension == ".csv":
+            yield from csv.DictReader(archivo)
+        elif extension == ".jsonl":
+            for linea in archivo:
+                if linea.strip():
+                    yield json.loads(linea)
+        elif extension == ".json":
+            yield from json.load(archivo)
+        else:
+            raise ValueError(f"Tipo de archivo no soportado: {extension}")
+
+
+def validar_cliente(registro):
+    """Funcion que valida un registro de cliente importado.
+    Regresa la tupla (nombre, apellido) o el motivo de rechazo"""
+    nombre = str(registro.get("nombre") or "").strip()
+    apellido = str(registro.get("apellido") or "").strip()
+    if not nombre_valido(nombre):
+        return "El nombre solo puede contener letras."
+    if not nombre_valido(apellido):
+        return "El apellido solo puede contener letras."
+    return (nombre, apellido)
+
+
+def validar_sala(registro):
+    """Funcion que valida un registro de sala importado.
+    Regresa la tupla (nombre, cupo) o el motivo de rechazo"""
+    nombre = str(registro.get("nombre") or "").strip()
+    cupo = registro.get("cupo")
+    cupo = "" if cupo is None else str(cupo).strip()
+    if not nombre_valido(nombre):
+        return "El nombre de la sala solo puede contener letras."
+    if not cupo_valido(cupo):
+        return "El cupo solo puede contener numeros."
+    return (nombre, int(cupo))
+
+
+@instrumentar()
+def importar_registros(registros, validar, insercion, tamano_lote=TAMANO_LOTE):
+    """Funcion que valida e inserta registros por lotes con executemany dentro de una
+    sola transaccion. Si algo falla no se guarda ningun registro.
+    Regresa el numero de registros insertados y la lista de rechazos (fila, motivo)"""
+    insertados = 0
+    rechazados = []
+    lote = []
+    with transaccion_escritura() as conexion:
+        cursor = conexion.cursor()
+        for numero, registro in enumerate(registros, start=1):
+            if not isinstance(registro, dict):
+                rechazados.append((numero, "El registro no tiene el formato esperado."))
+                continue
+            resultado = validar(registro)
+            if isinstance(resultado, str):
+                rechazados.append((numero, resultado))
+                continue
+            lote.append(resultado)
+            if len(lote) >= tamano_lote:
+                cursor.executemany(insercion, lote)
+                insertados += len(lote)
+                lote = []
+        if lote:
+            cursor.executemany(insercion, lote)
+            insertados += len(lote)
+    return insertados, rechazados
+
+
+def importar_clientes(ruta):
+    """Funcion que importa clientes desde un archivo con columnas nombre y apellido"""
+    return importar_registros(
+        leer_registros(ruta),
+        validar_cliente,
+        "INSERT INTO Clientes (nombre, apellido) VALUES(?,?)",
+    )
+
+
+def importar_salas(ruta):
+    """Funcion que importa salas desde un archivo con columnas nombre y cupo"""
+    try:
+        return importar_registros(
+            leer_registros(ruta),
+            validar_sala,
+            "INSERT INTO Salas (nombre, cupo) VALUES(?,?)",
+        )
+    finally:
+        catalogo.invalidar()
+
+
+CAMPOS_RESERVACION = ("id_cliente", "id_sala", "fecha", "id_turno", "evento")
+
+
+def convertir_fecha(texto):
+    """Funcion que convierte una fecha MM-DD-AAAA o AAAA-MM-DD a datetime.date"""
+    try:
+        return datetime.datetime.strptime(texto, "%m-%d-%Y").date()
+    except ValueError:
+        return datetime.date.fromisoformat(texto)
+
+
+def validar_reservacion(registro, hoy, recorrer_domingos=RECORRER_DOMINGOS):
+    """Funcion que aplica a un registro las reglas de registrar_reservacion que no
+    necesitan la base de datos. Regresa la tupla lista para insertar o el motivo de rechazo"""
+    if not isinstance(registro, dict):
+        if not isinstance(registro, (list, tuple)):
+            return "El registro no tiene el formato esperado."
+        if len(registro) != len(CAMPOS_RESERVACION):
+            return "El registro no tiene el formato esperado."
+        registro = dict(zip(CAMPOS_RESERVACION, registro))
+    try:
+        id_cliente = int(registro.get("id_cliente"))
+        id_sala = int(registro.get("id_sala"))
+        id_turno = int(registro.get("id_turno"))
+    except (TypeError, ValueError):
+        return "Las claves de cliente, sala y turno deben ser numeros."
+    try:
+        fecha = convertir_fecha(str(registro.get("fecha") or "").strip())
+    except ValueError:
+        return "Formato de fecha incorrecto, use MM-DD-AAAA."
+    if (fecha - hoy).days < DIAS_ANTICIPACION:
+        return "La reservacion debe ser mayor a 2 dias de anticipacion."
+    if fecha.weekday() == 6:
+        if not recorrer_domingos:
+            return "No se pueden realizar reservaciones los domingos."
+        fecha += datetime.timedelta(days=1)
+    evento = str(registro.get("evento") or "").strip()
+    if not nombre_valido(evento):
+        return "El nombre del evento solo puede contener letras."
+    return (id_cliente, id_sala, fecha.toordinal(), id_turno, evento)
+
+
+@instrumentar()
+def registrar_reservaciones_lote(registros, hoy=None, recorrer_domingos=RECORRER_DOMINGOS):
+    """Funcion que registra muchas reservaciones con las mismas reglas que
+    registrar_reservacion. Los registros son diccionarios con CAMPOS_RESERVACION
+    o tuplas en ese orden; los domingos se recorren al lunes si recorrer_domingos.
+    Los choques dentro del lote se detectan en memoria y los choques con la base
+    de datos y las claves inexistentes con una sola consulta; las aceptadas se
+    guardan en una sola transaccion.
+    Regresa el numero de reservaciones registradas y la lista de rechazos (fila, motivo)"""
+    if hoy is None:
+        hoy = datetime.date.today()
+    rechazos = {}
+    candidatas = []
+    for numero, registro in enumerate(registros, start=1):
+        resultado = validar_reservacion(registro, hoy, recorrer_domingos)
+        if isinstance(resultado, str):
+            rechazos[numero] = resultado
+        else:
+            candidatas.append((numero,) + resultado)
+
+    registradas = 0
+    with transaccion_ocupacion() as (conexion, cambios):
+        cursor = conexion.cursor()
+        cursor.execute(
+            """CREATE TEMP TABLE IF NOT EXISTS lote_reservaciones (numero INTEGER PRIMARY KEY,
+               id_cliente INTEGER, id_sala INTEGER, fecha INTEGER, id_turno INTEGER, evento TEXT)"""
+        )
+        cursor.execute("DELETE FROM temp.lote_reservaciones")
+        cursor.executemany(
+            "INSERT INTO temp.lote_reservaciones VALUES (?, ?, ?, ?, ?, ?)", candidatas
+        )
+        cursor.execute(CONSULTA_VALIDAR_LOTE)
+        rechazos.update(cursor.fetchall())
+
+        aceptadas = []
+        ocupados = set()
+        for numero, *reservacion in candidatas:
+            if numero in rechazos:
+                continue
+            espacio = (reservacion[1], reservacion[2], reservacion[3])
+            if espacio in ocupados:
+                rechazos[numero] = "Otra reservacion del lote ocupa esta sala, fecha y turno."
+                continue
+            ocupados.add(espacio)
+            aceptadas.append(reservacion)
+        cursor.executemany(
+            """INSERT INTO Reservaciones (id_cliente, id_sala, fecha, id_turno, evento, estatus)
+               VALUES (?, ?, ?, ?, ?, 'Activa')""",
+            aceptadas,
+        )
+        registradas = len(aceptadas)
+        cursor.execute("DELETE FROM temp.lote_reservaciones")
+        cambios.extend(
+            (id_sala, fecha, id_turno, 1) for _, id_sala, fecha, id_turno, _ in aceptadas
+        )
+    return registradas, sorted(rechazos.items())
+
+
+def importar_reservaciones(ruta):
+    """Funcion que importa reservaciones desde un archivo con columnas
+    id_cliente, id_sala, fecha, id_turno y evento"""
+    return registrar_reservaciones_lote(leer_registros(ruta))
+
+
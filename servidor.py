@@ -0,0 +1,557 @@
+"""Servidor HTTP/JSON local para que varias terminales usen la misma base de datos.
+
+Solo usa la biblioteca estandar (asyncio). Las consultas se ejecutan en un grupo
+acotado de hilos de lectura y todas las escrituras en un unico hilo, de modo que
+nunca hay dos transacciones de escritura compitiendo por el candado de SQLite.
+Cada hilo reutiliza su propia conexion (bd.obtener_conexion), asi que el grupo de
+hilos es a la vez el pool de conexiones.
+
+Rutas:
+    GET    /turnos
+    GET    /salas
+    GET    /salas/libres?desde=&hasta=&turno=&cupo=
+    GET    /clientes?texto=&limite=
+    POST   /clientes                 {"nombre", "apellido"}
+    POST   /salas                    {"nombre", "cupo"}
+    GET    /reservaciones?desde=&hasta=&despues_fecha=&despues_id=&limite=
+    GET    /reservaciones/<id>
+    POST   /reservaciones            {"id_cliente", "id_sala", "fecha", "id_turno", "evento"}
+    POST   /reservaciones/lote       {"reservaciones": [...], "recorrer_domingos"}
+    PATCH  /reservaciones/<id>       {"evento"}
+    DELETE /reservaciones/<id>
+    POST   /reservaciones/cancelar   {"ids": [...]}
+    POST   /exportaciones            {"formatos", "desde", "hasta", ...}
+    GET    /metricas                 trazas y latencias (con --trazas o COWORKING_TRAZAS)
+
+Las exportaciones se escriben en el directorio que indica --exportaciones, cada
+una en su propio subdirectorio para que dos peticiones al mismo tiempo no
+escriban los mismos archivos; los clientes no pueden elegir otro directorio.
+
+Con --archivar-cada N el hilo de escritura archiva cada N minutos las
+reservaciones canceladas y pasadas, un lote a la vez para no retrasar a los
+clientes. Las consultas y exportaciones incluyen las completadas archivadas.
+
+    python servidor.py --puerto 8080 --lectores 8
+"""
+
+import argparse
+import asyncio
+import datetime
+import functools
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from sqlite3 import Error
+from urllib.parse import parse_qs, urlsplit
+
+import servicios
+from archivo import TAMANO_LOTE_ARCHIVO, archivar
+from bd import a_fecha, configurar_bd
+from catalogo import catalogo
+from exportacion import crear_escritores, exportar_reservaciones
+from instrumentacion import activar_desde_entorno, instrumentacion
+from servicios import ErrorServicio
+
+TAMANO_MAXIMO_CUERPO = 10 * 1024 * 1024
+
+LIMITE_PAGINA = 500
+
+DIRECTORIO_EXPORTACIONES = "exportaciones"
+
+
+class ErrorHTTP(Exception):
+    """Error que se responde al cliente con el estado indicado"""
+
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+def _fecha(texto, nombre):
+    if not texto:
+        raise ErrorHTTP(HTTPStatus.BAD_REQUEST, f"Falta el parametro {nombre}.")
+    if not isinstance(texto, str):
+        raise ErrorHTTP(HTTPStatus.BAD_REQUEST, f"{nombre} debe ser una fecha en texto.")
+    try:
+        return servicios.convertir_fecha(texto)
+    except ValueError:
+        raise ErrorHTTP(
+            HTTPStatus.BAD_REQUEST, f"Formato de fecha incorrecto en {nombre}."
+        )
+
+
+def _entero(texto, nombre, omision=None, minimo=None):
+    if texto in (None, ""):
+        if omision is None:
+            raise ErrorHTTP(HTTPStatus.BAD_REQUEST, f"Falta el parametro {nombre}.")
+        return omision
+    try:
+        valor = int(texto)
+    except (TypeError, ValueError):
+        raise ErrorHTTP(HTTPStatus.BAD_REQUEST, f"{nombre} debe ser un numero.")
+    if minimo is not None and valor < minimo:
+        raise ErrorHTTP(HTTPStatus.BAD_REQUEST, f"{nombre} debe ser al menos {minimo}.")
+    return valor
+
+
+def _clave_cuerpo(cuerpo, nombre):
+    valor = cuerpo.get(nombre)
+    if valor is not None and (isinstance(valor, bool) or not isinstance(valor, int)):
+        raise ErrorHTTP(HTTPStatus.BAD_REQUEST, f"{nombre} debe ser un numero.")
+    return valor
+
+
+def _reservacion(fila):
+    id_reservacion, cliente, id_sala, fecha, turno, evento, id_turno = fila
+    return {
+        "id_reservaciones": id_reservacion,
+        "cliente": cliente,
+        "id_sala": id_sala,
+        "fecha": a_fecha(fecha).isoformat(),
+        "turno": turno,
+        "id_turno": id_turno,
+        "evento": evento,
+    }
+
+
+def _rechazos(rechazos):
+    return [{"fila": fila, "motivo": motivo} for fila, motivo in rechazos]
+
+
+# Operaciones de lectura: se ejecutan en el grupo de hilos de lectura
+
+
+def ver_turnos(parametros, cuerpo):
+    return {"turnos": catalogo.turnos()}
+
+
+def ver_salas(parametros, cuerpo):
+    return {
+        "salas": [
+            {"id_sala": id_sala, "nombre": nombre, "cupo": cupo}
+            for id_sala, (nombre, cupo) in catalogo.salas().items()
+        ]
+    }
+
+
+def ver_salas_libres(parametros, cuerpo):
+    salas = servicios.buscar_salas_libres(
+        _fecha(parametros.get("desde"), "desde"),
+        _fecha(parametros.get("hasta"), "hasta"),
+        _entero(parametros.get("turno"), "turno"),
+        _entero(parametros.get("cupo"), "cupo", 0),
+    )
+    return {
+        "salas": [
+            {
+                "id_sala": id_sala,
+                "nombre": nombre,
+                "cupo": cupo,
+                "fechas_libres": [fecha.isoformat() for fecha in fechas_libres],
+            }
+            for id_sala, nombre, cupo, fechas_libres in salas
+        ]
+    }
+
+
+def ver_clientes(parametros, cuerpo):
+    limite = min(
+        _entero(parametros.get("limite"), "limite", servicios.LIMITE_BUSQUEDA, minimo=1),
+        LIMITE_PAGINA,
+    )
+    clientes = servicios.buscar_clientes(parametros.get("texto", ""), limite)
+    return {
+        "clientes": [
+            {"id_cliente": id_cliente, "nombre": nombre, "apellido": apellido}
+            for id_cliente, nombre, apellido in clientes
+        ]
+    }
+
+
+def ver_reservaciones(parametros, cuerpo):
+    desde = _fecha(parametros.get("desde"), "desde").isoformat()
+    hasta = _fecha(parametros.get("hasta"), "hasta").isoformat()
+    limite = min(
+        _entero(parametros.get("limite"), "limite", servicios.TAMANO_PAGINA, minimo=1),
+        LIMITE_PAGINA,
+    )
+    despues = None
+    if parametros.get("despues_id"):
+        despues = (
+            _fecha(parametros.get("despues_fecha"), "despues_fecha").isoformat(),
+            _entero(parametros.get("despues_id"), "despues_id"),
+        )
+    filas, hay_siguiente = servicios.pagina_reservaciones(
+        desde, hasta, despues, limite, completadas=True
+    )
+    respuesta = {"reservaciones": [_reservacion(fila) for fila in filas]}
+    if hay_siguiente:
+        respuesta["siguiente"] = {
+            "despues_fecha": a_fecha(filas[-1][3]).isoformat(),
+            "despues_id": filas[-1][0],
+        }
+    return respuesta
+
+
+def ver_reservacion(parametros, cuerpo, id_reservacion):
+    fila = servicios.obtener_reservacion(id_reservacion)
+    if fila is None:
+        raise ErrorHTTP(HTTPStatus.NOT_FOUND, "Reservacion no encontrada.")
+    return _reservacion(fila)
+
+
+def ver_metricas(parametros, cuerpo):
+    if not instrumentacion.activa:
+        raise ErrorHTTP(HTTPStatus.NOT_FOUND, "La instrumentacion no esta activa.")
+    return instrumentacion.reporte()
+
+
+def exportar(parametros, cuerpo):
+    if "directorio" in cuerpo:
+        raise ErrorHTTP(
+            HTTPStatus.BAD_REQUEST,
+            "El directorio de las exportaciones lo define el servidor (--exportaciones).",
+        )
+    formatos = cuerpo.get("formatos") or ["csv"]
+    if not isinstance(formatos, list) or not all(
+        isinstance(formato, str) for formato in formatos
+    ):
+        raise ErrorHTTP(HTTPStatus.BAD_REQUEST, "formatos debe ser una lista de textos.")
+    filtro = {
+        "fecha_inicio": cuerpo.get("desde")
+        and _fecha(cuerpo.get("desde"), "desde").isoformat(),
+        "fecha_fin": cuerpo.get("hasta")
+        and _fecha(cuerpo.get("hasta"), "hasta").isoformat(),
+        "id_sala": _clave_cuerpo(cuerpo, "id_sala"),
+        "id_cliente": _clave_cuerpo(cuerpo, "id_cliente"),
+        "id_turno": _clave_cuerpo(cuerpo, "id_turno"),
+    }
+    os.makedirs(DIRECTORIO_EXPORTACIONES, exist_ok=True)
+    directorio = tempfile.mkdtemp(
+        prefix=datetime.datetime.now().strftime("%Y%m%d-%H%M%S-"),
+        dir=DIRECTORIO_EXPORTACIONES,
+    )
+    escritores = crear_escritores(formatos, directorio)
+    total = exportar_reservaciones(
+        escritores, en_hilos=len(escritores) > 1, filtro=filtro
+    )
+    errores = {
+        escritor.ruta: str(escritor.error) for escritor in escritores if escritor.error
+    }
+    if errores:
+        raise ErrorHTTP(HTTPStatus.INTERNAL_SERVER_ERROR, f"Error al exportar: {errores}")
+    if not total:
+        os.rmdir(directorio)
+        return {"exportadas": 0, "archivos": []}
+    return {"exportadas": total, "archivos": [escritor.ruta for escritor in escritores]}
+
+
+# Operaciones de escritura: se ejecutan una a la vez en el hilo de escritura
+
+
+def crear_cliente(parametros, cuerpo):
+    id_cliente = servicios.registrar_cliente(cuerpo.get("nombre"), cuerpo.get("apellido"))
+    return HTTPStatus.CREATED, {"id_cliente": id_cliente}
+
+
+def crear_sala(parametros, cuerpo):
+    id_sala = servicios.registrar_sala(cuerpo.get("nombre"), cuerpo.get("cupo"))
+    return HTTPStatus.CREATED, {"id_sala": id_sala}
+
+
+def crear_reservacion(parametros, cuerpo):
+    id_reservacion = servicios.reservar(
+        cuerpo.get("id_cliente"),
+        cuerpo.get("id_sala"),
+        str(cuerpo.get("fecha") or ""),
+        cuerpo.get("id_turno"),
+        cuerpo.get("evento"),
+    )
+    return HTTPStatus.CREATED, {"id_reservaciones": id_reservacion}
+
+
+def crear_reservaciones_lote(parametros, cuerpo):
+    reservaciones = cuerpo.get("reservaciones")
+    if not isinstance(reservaciones, list):
+        raise ErrorHTTP(HTTPStatus.BAD_REQUEST, "Falta la lista reservaciones.")
+    registradas, rechazos = servicios.registrar_reservaciones_lote(
+        reservaciones,
+        recorrer_domingos=bool(
+            cuerpo.get("recorrer_domingos", servicios.RECORRER_DOMINGOS)
+        ),
+    )
+    return {"registradas": registradas, "rechazos": _rechazos(rechazos)}
+
+
+def editar_reservacion(parametros, cuerpo, id_reservacion):
+    servicios.editar_evento(id_reservacion, cuerpo.get("evento"))
+    return {"id_reservaciones": id_reservacion}
+
+
+def cancelar_reservacion(parametros, cuerpo, id_reservacion):
+    servicios.cancelar(id_reservacion)
+    return {"id_reservaciones": id_reservacion}
+
+
+def cancelar_reservaciones(parametros, cuerpo):
+    ids = cuerpo.get("ids")
+    if not isinstance(ids, list):
+        raise ErrorHTTP(HTTPStatus.BAD_REQUEST, "Falta la lista ids.")
+    canceladas, rechazos = servicios.cancelar_lote(ids)
+    return {"canceladas": canceladas, "rechazos": _rechazos(rechazos)}
+
+
+RUTAS = {
+    ("GET", "/turnos"): (ver_turnos, False),
+    ("GET", "/salas"): (ver_salas, False),
+    ("GET", "/salas/libres"): (ver_salas_libres, False),
+    ("GET", "/clientes"): (ver_clientes, False),
+    ("GET", "/reservaciones"): (ver_reservaciones, False),
+    ("GET", "/metricas"): (ver_metricas, False),
+    ("POST", "/exportaciones"): (exportar, False),
+    ("POST", "/clientes"): (crear_cliente, True),
+    ("POST", "/salas"): (crear_sala, True),
+    ("POST", "/reservaciones"): (crear_reservacion, True),
+    ("POST", "/reservaciones/lote"): (crear_reservaciones_lote, True),
+    ("POST", "/reservaciones/cancelar"): (cancelar_reservaciones, True),
+}
+
+RUTAS_RESERVACION = {
+    "GET": (ver_reservacion, False),
+    "PATCH": (editar_reservacion, True),
+    "DELETE": (cancelar_reservacion, True),
+}
+
+
+def resolver_ruta(metodo, ruta):
+    """Regresa la funcion que atiende la peticion y si escribe en la base de datos"""
+    ruta = ruta.rstrip("/") or "/"
+    if (metodo, ruta) in RUTAS:
+        return RUTAS[(metodo, ruta)]
+    prefijo, _, clave = ruta.rpartition("/")
+    if prefijo == "/reservaciones" and clave.isdigit():
+        if metodo not in RUTAS_RESERVACION:
+            raise ErrorHTTP(HTTPStatus.METHOD_NOT_ALLOWED, "Metodo no permitido.")
+        funcion, escribe = RUTAS_RESERVACION[metodo]
+        return functools.partial(_con_clave, funcion, int(clave)), escribe
+    raise ErrorHTTP(HTTPStatus.NOT_FOUND, "Ruta no encontrada.")
+
+
+def _con_clave(funcion, clave, parametros, cuerpo):
+    return funcion(parametros, cuerpo, clave)
+
+
+def atender(funcion, parametros, cuerpo):
+    """Ejecuta la operacion en un hilo del executor y traduce el resultado a
+    (estado, respuesta)"""
+    try:
+        resultado = funcion(parametros, cuerpo)
+    except ErrorHTTP as e:
+        return e.estado, {"error": str(e)}
+    except ErrorServicio as e:
+        return HTTPStatus.UNPROCESSABLE_ENTITY, {"error": str(e)}
+    except ValueError as e:
+        return HTTPStatus.BAD_REQUEST, {"error": str(e)}
+    except (Error, OSError) as e:
+        return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+    except Exception as e:
+        # Cualquier otro error es un defecto, pero el cliente siempre recibe respuesta
+        return HTTPStatus.INTERNAL_SERVER_ERROR, {
+            "error": f"Error inesperado: {type(e).__name__}: {e}"
+        }
+    if isinstance(resultado, tuple):
+        return resultado
+    return HTTPStatus.OK, resultado
+
+
+class ServidorReservaciones:
+    """Servidor HTTP/1.1 con conexiones persistentes. Las lecturas usan hasta
+    'lectores' hilos y las escrituras un solo hilo; 'pendientes' limita cuantas
+    operaciones pueden esperar en el executor a la vez"""
+
+    def __init__(self, host="127.0.0.1", puerto=8080, lectores=8, pendientes=256):
+        self.host = host
+        self.puerto = puerto
+        self.lectores = ThreadPoolExecutor(lectores, thread_name_prefix="lector")
+        self.escritor = ThreadPoolExecutor(1, thread_name_prefix="escritor")
+        self.pendientes = asyncio.Semaphore(pendientes)
+        self.servidor = None
+
+    async def iniciar(self):
+        self.servidor = await asyncio.start_server(
+            self.atender_conexion, self.host, self.puerto
+        )
+        self.puerto = self.servidor.sockets[0].getsockname()[1]
+        return self
+
+    async def servir(self):
+        async with self.servidor:
+            await self.servidor.serve_forever()
+
+    async def cerrar(self):
+        if self.servidor is not None:
+            self.servidor.close()
+            await self.servidor.wait_closed()
+        self.lectores.shutdown()
+        self.escritor.shutdown()
+
+    async def ejecutar(self, funcion, escribe, parametros, cuerpo):
+        executor = self.escritor if escribe else self.lectores
+        async with self.pendientes:
+            return await asyncio.get_running_loop().run_in_executor(
+                executor, atender, funcion, parametros, cuerpo
+            )
+
+    async def archivar_periodicamente(self, intervalo):
+        """Archiva cada 'intervalo' segundos. Cada lote se encola por separado en el
+        hilo de escritura, asi que las escrituras de los clientes se intercalan"""
+        bucle = asyncio.get_running_loop()
+        while True:
+            try:
+                while (
+                    await bucle.run_in_executor(
+                        self.escritor, functools.partial(archivar, maximo_lotes=1)
+                    )
+                    == TAMANO_LOTE_ARCHIVO
+                ):
+                    pass
+            except Error as e:
+                print(f"No se pudo archivar: {e}")
+            await asyncio.sleep(intervalo)
+
+    async def atender_conexion(self, lector, escritor):
+        try:
+            while True:
+                linea = await lector.readline()
+                if not linea:
+                    break
+                try:
+                    metodo, destino, version = linea.decode("latin-1").split()
+                except ValueError:
+                    await self.responder(
+                        escritor, HTTPStatus.BAD_REQUEST, {"error": "Peticion invalida."}, False
+                    )
+                    break
+                encabezados = {}
+                while True:
+                    linea = await lector.readline()
+                    if linea in (b"\r\n", b"\n", b""):
+                        break
+                    nombre, _, valor = linea.decode("latin-1").partition(":")
+                    encabezados[nombre.strip().lower()] = valor.strip()
+                conexion = encabezados.get("connection", "").lower()
+                mantener = (
+                    conexion != "close"
+                    if version == "HTTP/1.1"
+                    else conexion == "keep-alive"
+                )
+                longitud = int(encabezados.get("content-length") or 0)
+                if longitud > TAMANO_MAXIMO_CUERPO:
+                    await self.responder(
+                        escritor,
+                        HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                        {"error": "Cuerpo demasiado grande."},
+                        False,
+                    )
+                    break
+                datos = await lector.readexactly(longitud) if longitud else b""
+                estado, respuesta = await self.procesar(metodo.upper(), destino, datos)
+                await self.responder(escritor, estado, respuesta, mantener)
+                if not mantener:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            escritor.close()
+
+    async def procesar(self, metodo, destino, datos):
+        partes = urlsplit(destino)
+        parametros = {
+            llave: valores[-1] for llave, valores in parse_qs(partes.query).items()
+        }
+        try:
+            funcion, escribe = resolver_ruta(metodo, partes.path)
+            cuerpo = json.loads(datos) if datos else {}
+            if not isinstance(cuerpo, dict):
+                raise ErrorHTTP(HTTPStatus.BAD_REQUEST, "El cuerpo debe ser un objeto JSON.")
+        except ErrorHTTP as e:
+            return e.estado, {"error": str(e)}
+        except ValueError:
+            return HTTPStatus.BAD_REQUEST, {"error": "El cuerpo no es JSON valido."}
+        return await self.ejecutar(funcion, escribe, parametros, cuerpo)
+
+    async def responder(self, escritor, estado, respuesta, mantener):
+        cuerpo = json.dumps(respuesta, ensure_ascii=False).encode("utf-8")
+        estado = HTTPStatus(estado)
+        escritor.write(
+            (
+                f"HTTP/1.1 {estado.value} {estado.phrase}\r\n"
+                "Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(cuerpo)}\r\n"
+                f"Connection: {'keep-alive' if mantener else 'close'}\r\n\r\n"
+            ).encode("latin-1")
+            + cuerpo
+        )
+        await escritor.drain()
+
+
+async def _servir(argumentos):
+    servidor = ServidorReservaciones(
+        argumentos.host, argumentos.puerto, argumentos.lectores, argumentos.pendientes
+    )
+    await servidor.iniciar()
+    print(f"Servidor de reservaciones en http://{servidor.host}:{servidor.puerto}")
+    archivo = None
+    if argumentos.archivar_cada > 0:
+        archivo = asyncio.create_task(
+            servidor.archivar_periodicamente(argumentos.archivar_cada * 60)
+        )
+    try:
+        await servidor.servir()
+    finally:
+        if archivo is not None:
+            archivo.cancel()
+        await servidor.cerrar()
+
+
+def main(argv=None):
+    global DIRECTORIO_EXPORTACIONES
+    parser = argparse.ArgumentParser(description="Servidor HTTP/JSON de reservaciones")
+    parser.add_argument("--bd", help="Ruta de la base de datos")
+    parser.add_argument("--trazas", help="Activa las trazas y las escribe en este JSON al salir")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8080)
+    parser.add_argument("--lectores", type=int, default=8, help="Hilos de lectura")
+    parser.add_argument(
+        "--pendientes", type=int, default=256, help="Operaciones en espera como maximo"
+    )
+    parser.add_argument(
+        "--archivar-cada",
+        type=float,
+        default=0,
+        help="Minutos entre corridas del archivo de reservaciones (por omision no se archiva)",
+    )
+    parser.add_argument(
+        "--exportaciones",
+        default=DIRECTORIO_EXPORTACIONES,
+        help="Directorio donde POST /exportaciones escribe los archivos",
+    )
+    argumentos = parser.parse_args(argv)
+    DIRECTORIO_EXPORTACIONES = argumentos.exportaciones
+    if argumentos.bd:
+        configurar_bd(argumentos.bd)
+    activar_desde_entorno(argumentos.trazas)
+    avisos = []
+    servicios.crear_esquema(avisos)
+    for aviso in avisos:
+        print(aviso)
+    try:
+        asyncio.run(_servir(argumentos))
+    except KeyboardInterrupt:
+        print("Servidor detenido.")
+
+
+if __name__ == "__main__":
+    main()